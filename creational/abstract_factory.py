@@ -1,8 +1,27 @@
 from __future__ import annotations
+import gc
 from abc import ABC, abstractmethod
+from time import perf_counter
+from typing import Dict, List, Set, Type, TypeVar, Union
+
+Product = TypeVar("Product", bound=Union["AbstractChair", "AbstractTable"])
 
 
 class AbstractFurnitureFactory(ABC):
+    """
+    With `shared=True` the factory hands out one instance of every stateless
+    product instead of allocating a new one per call. Stateful products can
+    be given back with `release`, which resets them and keeps up to
+    `pool_size` of them for the next `create_*` call.
+    """
+
+    def __init__(self, shared: bool = False, pool_size: int = 64) -> None:
+        self._shared = shared
+        self._pool_size = pool_size
+        self._shared_products: Dict[type, AbstractChair | AbstractTable] = {}
+        self._pools: Dict[type, List[AbstractChair | AbstractTable]] = {}
+        self._pooled: Set[int] = set()
+
     @abstractmethod
     def create_chair(self) -> AbstractChair:
         pass
@@ -11,28 +30,71 @@ class AbstractFurnitureFactory(ABC):
     def create_table(self) -> AbstractTable:
         pass
 
+    def create_batch(self, kind: str, n: int) -> List[AbstractChair | AbstractTable]:
+        """Creates `n` products of a `kind`: chair or table"""
+        if kind not in ("chair", "table"):
+            raise ValueError(f"unknown product kind: {kind!r}")
+        create = getattr(self, f"create_{kind}")
+        if n <= 0:
+            return []
+        first = create()
+        if self._shared and first.stateless:
+            return [first] * n
+        return [first, *(create() for _ in range(n - 1))]
+
+    def release(self, product: AbstractChair | AbstractTable) -> None:
+        if self._shared and product.stateless:
+            return
+        if id(product) in self._pooled:
+            raise ValueError(f"{product!r} is already released")
+        pool = self._pools.setdefault(type(product), [])
+        if len(pool) < self._pool_size:
+            product.reset()
+            pool.append(product)
+            self._pooled.add(id(product))
+
+    def _make(self, product_class: Type[Product]) -> Product:
+        if self._shared and product_class.stateless:
+            product = self._shared_products.get(product_class)
+            if product is None:
+                product = self._shared_products[product_class] = product_class()
+            return product
+        pool = self._pools.get(product_class)
+        if pool:
+            product = pool.pop()
+            self._pooled.discard(id(product))
+            return product
+        return product_class()
+
 
 class ModernFurnitureFactory(AbstractFurnitureFactory):
     def create_chair(self) -> AbstractChair:
-        return ModernChair()
+        return self._make(ModernChair)
 
     def create_table(self) -> AbstractTable:
-        return ModernTable()
+        return self._make(ModernTable)
 
 
 class VictorianFurnitureFactory(AbstractFurnitureFactory):
     def create_chair(self) -> AbstractChair:
-        return VictorianChair()
+        return self._make(VictorianChair)
 
     def create_table(self) -> AbstractTable:
-        return VictorianTable()
+        return self._make(VictorianTable)
 
 
 class AbstractChair(ABC):
+    # stateless products may be shared between all callers of a factory
+    stateless: bool = True
+
     @abstractmethod
     def sit(self) -> str:
         pass
 
+    def reset(self) -> None:
+        """Returns a pooled product to its initial state"""
+        pass
+
 
 class ModernChair(AbstractChair):
     def sit(self) -> str:
@@ -45,10 +107,15 @@ class VictorianChair(AbstractChair):
 
 
 class AbstractTable(ABC):
+    stateless: bool = True
+
     @abstractmethod
     def clean(self) -> None:
         pass
 
+    def reset(self) -> None:
+        pass
+
     @abstractmethod
     def eat(self, chair: AbstractChair) -> None:
         pass
@@ -85,6 +152,34 @@ def client_code(factory: AbstractFurnitureFactory) -> None:
     print(f"{table.eat(chair)}", end="")
 
 
+def benchmark_client_loop(requests: int = 1_000_000) -> None:
+    """`client_code` without printing, as a request handler would run it"""
+
+    def allocating(factory: AbstractFurnitureFactory) -> None:
+        for _ in range(requests):
+            factory.create_table().eat(factory.create_chair())
+
+    def pooled(factory: AbstractFurnitureFactory) -> None:
+        for _ in range(requests):
+            table, chair = factory.create_table(), factory.create_chair()
+            table.eat(chair)
+            factory.release(chair)
+            factory.release(table)
+
+    for label, factory, loop in (("new objects", ModernFurnitureFactory(), allocating),
+                                 ("pooled", ModernFurnitureFactory(), pooled),
+                                 ("shared", ModernFurnitureFactory(shared=True), allocating)):
+        gc.collect()
+        collections = [generation["collections"] for generation in gc.get_stats()]
+        started = perf_counter()
+        loop(factory)
+        elapsed = perf_counter() - started
+        collections = [generation["collections"] - before
+                       for generation, before in zip(gc.get_stats(), collections)]
+        print(f"Benchmark: {label:11} {requests / elapsed:12,.0f} requests/s, "
+              f"GC collections per generation: {collections}")
+
+
 if __name__ == "__main__":
     print("Client: Testing client code with the first factory type:")
     client_code(ModernFurnitureFactory())
@@ -93,3 +188,12 @@ if __name__ == "__main__":
 
     print("Client: Testing the same client code with the second factory type:")
     client_code(VictorianFurnitureFactory())
+
+    print("\n")
+
+    factory = VictorianFurnitureFactory(shared=True)
+    chairs = factory.create_batch("chair", 3)
+    print(f"Client: a batch of {len(chairs)} shared chairs is one object: "
+          f"{len(set(map(id, chairs))) == 1}")
+    print("")
+    benchmark_client_loop()
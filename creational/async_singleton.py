@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from creational.naive_singleton import MultitonMeta
+
+
+class AsyncMultitonMeta(MultitonMeta):
+    """
+    Calling the class returns an awaitable: `connection = await Database(url)`.
+    The instance is built and its `async def initialize(self)` awaited only
+    once per key, concurrent callers await the same in-flight task.
+
+    Every caller awaits the task through `asyncio.shield`, so cancelling one
+    caller (even the one that started initialization) never aborts the setup
+    the others are waiting for. A failed initialization is not cached and the
+    next caller starts a new one.
+    """
+
+    def __init__(cls, name, bases, namespace, maxsize: Optional[int] = None,
+                 weak: bool = False, **kwargs) -> None:
+        super().__init__(name, bases, namespace, maxsize=maxsize, weak=weak, **kwargs)
+        cls._multiton_pending: Dict[Hashable, asyncio.Task] = {}
+
+    def __call__(cls, *args, **kwargs):
+        return cls._get_or_create(cls._make_key(args, kwargs), args, kwargs)
+
+    async def _get_or_create(cls, key: Hashable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        instance = cls._lookup(key)
+        if instance is not None:
+            return instance
+
+        # there is no await between the lookup and publishing the task, so the
+        # event loop cannot interleave another caller here and no lock is needed
+        task = cls._multiton_pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(cls._create(key, args, kwargs))
+            task.add_done_callback(cls._forget_pending(key))
+            cls._multiton_pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _create(cls, key: Hashable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        instance = type.__call__(cls, *args, **kwargs)
+        initialize = getattr(instance, "initialize", None)
+        if initialize is not None:
+            await initialize()
+        cls._store(key, instance)
+        return instance
+
+    def _forget_pending(cls, key: Hashable):
+        def callback(task: asyncio.Task) -> None:
+            if cls._multiton_pending.get(key) is task:
+                del cls._multiton_pending[key]
+            if not task.cancelled():
+                # mark the error as retrieved even if every caller went away
+                task.exception()
+        return callback
+
+
+class AsyncSingletonMeta(AsyncMultitonMeta):
+    """Single instance per class, constructor arguments of later calls are ignored"""
+
+    def _make_key(cls, args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+        return cls
+
+
+class Database(metaclass=AsyncSingletonMeta):
+    initializations = 0
+
+    def __init__(self, url: str, setup_delay: float = 0.05) -> None:
+        self.url = url
+        self._setup_delay = setup_delay
+        self.ready = False
+
+    async def initialize(self) -> None:
+        Database.initializations += 1
+        await asyncio.sleep(self._setup_delay)
+        self.ready = True
+
+
+class Endpoint(metaclass=AsyncMultitonMeta, maxsize=64):
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+    async def initialize(self) -> None:
+        await asyncio.sleep(0.01)
+
+
+async def benchmark_startup(coroutines: int = 10_000) -> None:
+    """Thousands of coroutines ask for the instance before it exists"""
+    Database._multiton_entries.clear()
+    Database.initializations = 0
+
+    started = perf_counter()
+    instances = await asyncio.gather(*(Database("db://primary") for _ in range(coroutines)))
+    elapsed = perf_counter() - started
+
+    started = perf_counter()
+    for _ in range(coroutines):
+        await Database("db://primary")
+    warm = perf_counter() - started
+
+    print(f"Benchmark: {coroutines} concurrent callers got "
+          f"{len(set(map(id, instances)))} instance(s) after "
+          f"{Database.initializations} initialization(s) in {elapsed * 1e3:.1f}ms, "
+          f"warm lookup {warm / coroutines * 1e6:.2f}us")
+    assert Database.initializations == 1
+
+
+async def main() -> None:
+    first = asyncio.ensure_future(Database("db://primary"))
+    others = [asyncio.ensure_future(Database("db://replica")) for _ in range(3)]
+    await asyncio.sleep(0)
+    first.cancel()
+    instances = await asyncio.gather(*others)
+    print(f"Client: the first caller was cancelled, the others still got a ready "
+          f"instance: {all(i.ready for i in instances)}, "
+          f"url: {instances[0].url}, initializations: {Database.initializations}")
+
+    a, b, c = await asyncio.gather(Endpoint("con://a"), Endpoint("con://a"), Endpoint("con://b"))
+    print(f"Client: endpoints are keyed by url: {a is b and a is not c}\n")
+
+    await benchmark_startup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,18 @@
 from __future__ import annotations
+import gc
+import sys
+import tracemalloc
 from abc import ABC, abstractmethod
-from typing import Any
+from itertools import repeat
+from time import perf_counter
+from typing import Any, Callable, Iterator, List, Sequence, Tuple, Union
 
 
 class HouseBuilder(ABC):
+    # a cacheable builder adds the same parts for the same steps every time,
+    # so Director.build_many may run a plan once and reuse its parts
+    cacheable: bool = False
+
     def __init__(self) -> None:
         self._product = HouseProduct()
 
@@ -25,6 +34,8 @@ class HouseBuilder(ABC):
 
 
 class HouseWithGarageBuilder(HouseBuilder):
+    cacheable = True
+
     @property
     def product(self) -> HouseProduct:
         product = self._product
@@ -39,6 +50,8 @@ class HouseWithGarageBuilder(HouseBuilder):
 
 
 class HouseWithSwimmingPool(HouseBuilder):
+    cacheable = True
+
     @property
     def product(self) -> HouseProduct:
         product = self._product
@@ -63,6 +76,27 @@ class HouseProduct:
         print(f"Product parts: {', '.join(self.parts)}", end="")
 
 
+class CompactHouseProduct:
+    """
+    Immutable product for bulk building: parts are a tuple of interned names,
+    so houses built by the same plan share one tuple.
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: Tuple[str, ...]) -> None:
+        self.parts = parts
+
+    def list_parts(self) -> None:
+        print(f"Product parts: {', '.join(self.parts)}", end="")
+
+
+Plan = Sequence[Union[str, "Plan"]]
+
+MINIMAL_VIABLE_HOUSE: Plan = ("build_garage",)
+FULL_FEATURED_HOUSE: Plan = ("build_garage", "build_swimming_pool")
+
+
 class Director:
     """Optional class allows you to build house by defined plan"""
 
@@ -84,6 +118,92 @@ class Director:
         self.builder.build_garage()
         self.builder.build_swimming_pool()
 
+    def compile(self, plan: Plan) -> Tuple[str, ...]:
+        """Flattens a plan of builder step names, nested plans allowed"""
+        steps = []
+        pending = [iter(plan)]
+        while pending:
+            step = next(pending[-1], None)
+            if step is None:
+                pending.pop()
+            elif isinstance(step, str):
+                steps.append(step)
+            else:
+                pending.append(iter(step))
+        return tuple(steps)
+
+    def build_many(self, plan: Plan, count: int) -> Iterator[CompactHouseProduct]:
+        """
+        Yields `count` houses lazily, the plan is compiled only once. The
+        steps run for every house, unless the builder is `cacheable`: then
+        they run once and all houses share the parts tuple.
+        """
+        builder = self.builder
+        calls = [getattr(builder, step) for step in self.compile(plan)]
+        builder.reset()
+        if builder.cacheable:
+            parts = self._run(calls)
+            for _ in repeat(None, count):
+                yield CompactHouseProduct(parts)
+        else:
+            for _ in repeat(None, count):
+                yield CompactHouseProduct(self._run(calls))
+
+    def build_batch(self, plan: Plan, count: int) -> List[CompactHouseProduct]:
+        return list(self.build_many(plan, count))
+
+    def _run(self, calls: List[Callable[[], None]]) -> Tuple[str, ...]:
+        # reading `product` resets the builder for the next house
+        for call in calls:
+            call()
+        return tuple(map(sys.intern, self.builder.product.parts))
+
+
+def benchmark_bulk_build(count: int = 1_000_000) -> None:
+    director = Director()
+
+    def one_by_one(builder: HouseBuilder) -> List[HouseProduct]:
+        director.builder = builder
+        houses = []
+        for _ in range(count):
+            director.build_full_featured_house()
+            houses.append(builder.product)
+        return houses
+
+    def batch(builder: HouseBuilder) -> List[CompactHouseProduct]:
+        # the steps run for every house, as for a builder that is not cacheable
+        builder.cacheable = False
+        director.builder = builder
+        return director.build_batch(FULL_FEATURED_HOUSE, count)
+
+    def cached_batch(builder: HouseBuilder) -> List[CompactHouseProduct]:
+        director.builder = builder
+        return director.build_batch(FULL_FEATURED_HOUSE, count)
+
+    def streamed(builder: HouseBuilder) -> int:
+        director.builder = builder
+        return sum(1 for _ in director.build_many(FULL_FEATURED_HOUSE, count))
+
+    for builder_class in (HouseWithGarageBuilder, HouseWithSwimmingPool):
+        for label, build in (("one by one", one_by_one), ("batch, per house steps", batch),
+                             ("batch, cached parts", cached_batch),
+                             ("many, cached parts", streamed)):
+            gc.collect()
+            started = perf_counter()
+            houses = build(builder_class())
+            elapsed = perf_counter() - started
+            del houses
+
+            gc.collect()
+            tracemalloc.start()
+            houses = build(builder_class())
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del houses
+            print(f"Benchmark: {builder_class.__name__:22} {label:22} {count} houses in "
+                  f"{elapsed:.2f}s ({count / elapsed:,.0f} houses/s), "
+                  f"{memory / 2 ** 20:6.1f}MiB retained")
+
 
 if __name__ == "__main__":
     director = Director()
@@ -107,3 +227,14 @@ if __name__ == "__main__":
     builder.build_garage()
     builder.build_swimming_pool()
     builder.product.list_parts()
+
+    print("\n")
+
+    print("Batch of products built by a compiled plan: ")
+    director.builder = builder
+    for house in director.build_many((MINIMAL_VIABLE_HOUSE, "build_swimming_pool"), 2):
+        house.list_parts()
+        print("")
+
+    print("")
+    benchmark_bulk_build()
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from itertools import count
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter, sleep
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+from creational.multithreading_singleton import SingletonMeta
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+
+class PoolClosed(Exception):
+    """The pool was closed before or while the connection was checked out"""
+
+
+class PoolStats:
+    def __init__(self, max_size: int, window: int = 10_000) -> None:
+        self.max_size = max_size
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    @property
+    def utilization(self) -> float:
+        return self.in_use / self.max_size
+
+    def latency(self, percentile: float) -> float:
+        """Checkout latency percentile over the recent window, in seconds"""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def __str__(self) -> str:
+        return (f"checkouts={self.checkouts} waits={self.waits} timeouts={self.timeouts} "
+                f"created={self.created} discarded={self.discarded} "
+                f"peak_utilization={self.peak_in_use / self.max_size:.0%} "
+                f"checkout_p50={self.latency(50) * 1e3:.3f}ms "
+                f"checkout_p99={self.latency(99) * 1e3:.3f}ms")
+
+
+class _Waiter:
+    """A caller queued for a connection, woken once one is granted to it"""
+
+    __slots__ = ("event", "granted", "connection")
+
+    def __init__(self) -> None:
+        self.event = Event()
+        self.granted = False
+        self.connection: Any = None
+
+
+class ConnectionPool:
+    """
+    Bounded pool: at most `max_size` connections exist, `min_size` of them are
+    opened up front and kept even when idle. Callers that find the pool empty
+    wait in a FIFO queue, each returned connection or freed slot is handed to
+    the longest waiting caller, until it gets one or `timeout` expires.
+    """
+
+    def __init__(self, factory: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 idle_timeout: Optional[float] = None,
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 close: Optional[Callable[[Any], None]] = None,
+                 timeout: Optional[float] = None) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+        self._factory = factory
+        self._min_size = min_size
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._health_check = health_check
+        self._close = close
+        self._timeout = timeout
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._waiters: Deque[_Waiter] = deque()
+        self._size = 0
+        self._lock = Lock()
+        self._closed = False
+        self.stats = PoolStats(max_size)
+
+        for _ in range(min_size):
+            self._idle.append((self._open(), monotonic()))
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        timeout = self._timeout if timeout is None else timeout
+        started = perf_counter()
+        waited = False
+
+        with self._lock:
+            if self._closed:
+                raise PoolClosed("the pool is closed")
+            self._expire_idle()
+            # a caller never overtakes the ones already waiting
+            granted, connection = (False, None) if self._waiters else self._grant()
+            if not granted:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if not granted:
+            waited = True
+            waiter.event.wait(timeout)
+            with self._lock:
+                if not waiter.granted and self._closed:
+                    raise PoolClosed("the pool was closed while waiting")
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    self.stats.timeouts += 1
+                    raise PoolTimeout(f"no connection available within {timeout}s")
+            connection = waiter.connection
+
+        if connection is not None and self._health_check is not None:
+            try:
+                healthy = self._health_check(connection)
+            except BaseException:
+                self._discard(connection)
+                raise
+            if not healthy:
+                # the slot stays with this caller, a fresh connection replaces the broken one
+                with self._lock:
+                    self.stats.discarded += 1
+                self._close_connection(connection)
+                connection = None
+
+        if connection is None:
+            try:
+                connection = self._factory()
+            except BaseException:
+                with self._lock:
+                    self._size -= 1
+                    self._dispatch()
+                raise
+            with self._lock:
+                self.stats.created += 1
+
+        with self._lock:
+            closed = self._closed
+            if closed:
+                self._size -= 1
+        if closed:
+            # the connection was opened or checked while the pool was closing
+            self._close_connection(connection)
+            raise PoolClosed("the pool was closed during the checkout")
+
+        with self._lock:
+            stats = self.stats
+            stats.checkouts += 1
+            stats.waits += waited
+            stats.in_use += 1
+            stats.peak_in_use = max(stats.peak_in_use, stats.in_use)
+            stats._latencies.append(perf_counter() - started)
+        return connection
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        if discard:
+            with self._lock:
+                self.stats.in_use -= 1
+            self._discard(connection)
+            return
+
+        with self._lock:
+            self.stats.in_use -= 1
+            closed = self._closed
+            if closed:
+                self._size -= 1
+            else:
+                self._idle.append((connection, monotonic()))
+                self._dispatch()
+        if closed:
+            self._close_connection(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Checks a connection out for the `with` block, a failing block discards it"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except BaseException:
+            self.release(connection, discard=True)
+            raise
+        self.release(connection)
+
+    def close(self) -> None:
+        """
+        Closes the idle connections and fails the waiting callers, connections
+        still checked out are closed when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            waiters, self._waiters = self._waiters, deque()
+        for waiter in waiters:
+            waiter.event.set()
+        for connection, _ in idle:
+            self._close_connection(connection)
+
+    def _grant(self) -> Tuple[bool, Any]:
+        """
+        Takes an idle connection or reserves a slot for a new one, the caller
+        opens it outside the lock. Must be called with the lock held.
+        """
+        if self._idle:
+            connection, _ = self._idle.pop()
+            return True, connection
+        if self._size < self._max_size:
+            self._size += 1
+            return True, None
+        return False, None
+
+    def _dispatch(self) -> None:
+        """Hands what is available to the waiters in arrival order, under the lock"""
+        while self._waiters and not self._closed:
+            granted, connection = self._grant()
+            if not granted:
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            waiter.connection = connection
+            waiter.event.set()
+
+    def _open(self) -> Any:
+        connection = self._factory()
+        self._size += 1
+        self.stats.created += 1
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        with self._lock:
+            self._size -= 1
+            self.stats.discarded += 1
+            self._dispatch()
+        self._close_connection(connection)
+
+    def _close_connection(self, connection: Any) -> None:
+        if self._close is not None:
+            self._close(connection)
+
+    def _expire_idle(self) -> None:
+        """Drops connections idle for too long, the oldest ones sit on the left"""
+        if self._idle_timeout is None:
+            return
+        expired_before = monotonic() - self._idle_timeout
+        while (self._idle and self._size > self._min_size
+               and self._idle[0][1] < expired_before):
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self.stats.discarded += 1
+            self._close_connection(connection)
+
+
+class SharedConnectionPool(ConnectionPool, metaclass=SingletonMeta):
+    """Process wide pool: the singleton now owns connections instead of being one"""
+
+
+class FakeConnection:
+    def __init__(self, backend: FakeBackend, number: int) -> None:
+        self._backend = backend
+        self.number = number
+        self.closed = False
+
+    def query(self, sql: str) -> str:
+        sleep(self._backend.query_delay)
+        return f"connection #{self.number}: {sql}"
+
+    def ping(self) -> bool:
+        return not self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeBackend:
+    """In-process stand-in for a database with fixed connect and query costs"""
+
+    def __init__(self, connect_delay: float = 0.005, query_delay: float = 0.001) -> None:
+        self.connect_delay = connect_delay
+        self.query_delay = query_delay
+        self._numbers = count(1)
+
+    def connect(self) -> FakeConnection:
+        sleep(self.connect_delay)
+        return FakeConnection(self, next(self._numbers))
+
+
+def benchmark_pool(threads: int = 64, queries: int = 200, max_size: int = 16) -> None:
+    backend = FakeBackend()
+    pool = ConnectionPool(backend.connect, min_size=4, max_size=max_size, idle_timeout=30,
+                          health_check=FakeConnection.ping, close=FakeConnection.close)
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(index: int) -> None:
+        own = latencies[index]
+        for _ in range(queries):
+            started = perf_counter()
+            with pool.connection() as connection:
+                connection.query("SELECT 1")
+            own.append(perf_counter() - started)
+
+    workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = perf_counter() - started
+    pool.close()
+
+    ordered = sorted(latency for own in latencies for latency in own)
+    total = len(ordered)
+    print(f"Benchmark: {threads} threads, pool of {max_size}: {total} queries in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f} queries/s), "
+          f"p50={ordered[total // 2] * 1e3:.2f}ms p99={ordered[int(total * 0.99)] * 1e3:.2f}ms")
+    print(f"Stats: {pool.stats}")
+
+
+if __name__ == "__main__":
+    pool = SharedConnectionPool(FakeBackend().connect, min_size=1, max_size=2)
+    print(f"Client: the pool is a singleton as well: {pool is SharedConnectionPool(None)}")
+
+    with pool.connection() as first, pool.connection() as second:
+        print(first.query("SELECT 1"))
+        print(second.query("SELECT 2"))
+        try:
+            pool.acquire(timeout=0.05)
+        except PoolTimeout as error:
+            print(f"Client: third caller gave up: {error}")
+
+    print(f"Client: the pool has {pool.size} open connections, stats: {pool.stats}\n")
+    benchmark_pool()
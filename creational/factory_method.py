@@ -1,5 +1,10 @@
 from __future__ import annotations
+import os
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from time import perf_counter
+from typing import Iterator, List, Optional
 
 
 class Logistic(ABC):
@@ -8,9 +13,11 @@ class Logistic(ABC):
         """This is the factory method"""
         pass
 
-    def plan_delivery(self) -> str:
-        # call fabric method `create_transport` to get transport instance
-        transport = self.create_transport()
+    def plan_delivery(self, transport: Optional[Transport] = None) -> str:
+        # call fabric method `create_transport` to get transport instance,
+        # unless the caller already has one to reuse
+        if transport is None:
+            transport = self.create_transport()
         result = f"Creator: The same creator's code has just worked with {transport.deliver()}"
 
         return result
@@ -42,6 +49,77 @@ class Truck(Transport):
         return "Our truck is the king of the road, we will be just in time"
 
 
+class HeavyTruck(Transport):
+    """Truck that computes its route, a CPU bound delivery"""
+
+    def __init__(self, route_length: int = 20_000) -> None:
+        self._route_length = route_length
+
+    def deliver(self) -> str:
+        distance = sum(i * i % 7 for i in range(self._route_length))
+        return f"Heavy truck has computed a route of {distance} km"
+
+
+class HeavyRoadLogistic(Logistic):
+    def create_transport(self) -> Transport:
+        return HeavyTruck()
+
+
+_worker = threading.local()
+
+
+def _start_worker(logistic: Logistic) -> None:
+    """Runs once per worker thread or process, the transport is reused by all its tasks"""
+    _worker.logistic = logistic
+    _worker.transport = logistic.create_transport()
+
+
+def _plan_chunk(size: int) -> List[str]:
+    logistic, transport = _worker.logistic, _worker.transport
+    return [logistic.plan_delivery(transport) for _ in range(size)]
+
+
+def plan_deliveries(logistic: Logistic, count: int, workers: Optional[int] = None,
+                    processes: bool = False, ordered: bool = True,
+                    chunksize: int = 64) -> Iterator[str]:
+    """
+    Plans `count` deliveries on a pool of threads (or processes for CPU bound
+    transports, `logistic` must be picklable then). Deliveries are sent to
+    the workers in chunks and results are streamed back in order, or as soon
+    as a chunk is done when `ordered` is false.
+    """
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    executor = executor_class(workers, initializer=_start_worker, initargs=(logistic,))
+    try:
+        futures = [executor.submit(_plan_chunk, min(chunksize, count - start))
+                   for start in range(0, count, chunksize)]
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
+    finally:
+        # a consumer that stops early must not wait for the remaining chunks
+        executor.shutdown(cancel_futures=True)
+
+
+def benchmark_scaling(count: int = 2_000) -> None:
+    logistic = HeavyRoadLogistic()
+
+    started = perf_counter()
+    for _ in range(count):
+        logistic.plan_delivery()
+    baseline = perf_counter() - started
+    print(f"Benchmark: sequential           {count / baseline:8,.0f} deliveries/s")
+
+    cores = os.cpu_count() or 1
+    for processes in (False, True):
+        for workers in sorted({1, 2, 4, cores}):
+            started = perf_counter()
+            for _ in plan_deliveries(logistic, count, workers, processes=processes, ordered=False):
+                pass
+            elapsed = perf_counter() - started
+            print(f"Benchmark: {'processes' if processes else 'threads':9} x {workers:<3}     "
+                  f"{count / elapsed:8,.0f} deliveries/s, {baseline / elapsed:4.1f}x")
+
+
 def client_code(logistic: Logistic) -> None:
     print(f"Client: I'm not aware of the logistic's class, but it still works.\n"
           f"{logistic.plan_delivery()}", end="")
@@ -54,3 +132,11 @@ if __name__ == "__main__":
 
     print("App: Launched with the SeaLogistic.")
     client_code(SeaLogistic())
+    print("\n")
+
+    print("App: Planning a batch of deliveries with the SeaLogistic.")
+    for result in plan_deliveries(SeaLogistic(), 3, workers=2):
+        print(result)
+    print("")
+
+    benchmark_scaling()
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+from threading import Lock
+from time import monotonic, perf_counter, sleep
+from typing import Any, Dict, Tuple
+
+from creational.multithreading_singleton import Connection, SingletonMeta
+
+# built in the parent right before fork, children inherit it copy-on-write
+FORK_SHARE = "share"
+# dropped in the child, rebuilt lazily on the first call there
+FORK_RESET = "reset"
+# dropped in the child and rebuilt eagerly right after fork
+FORK_REBUILD = "rebuild"
+
+_policies: Dict[type, Tuple[str, Tuple, Dict[str, Any]]] = {}
+
+
+def register_fork_policy(cls: SingletonMeta, policy: str, *args, **kwargs) -> None:
+    """
+    A forked child inherits `SingletonMeta._instances` as is. Immutable objects
+    (configuration, lookup tables) should be shared copy-on-write, process
+    local ones such as `Connection` must be reset. `args` and `kwargs` are used
+    to build the instance for the share and rebuild policies.
+    """
+    if policy not in (FORK_SHARE, FORK_RESET, FORK_REBUILD):
+        raise ValueError(f"unknown fork policy: {policy!r}")
+    _policies[cls] = (policy, args, kwargs)
+
+
+def unregister_fork_policy(cls: SingletonMeta) -> None:
+    _policies.pop(cls, None)
+
+
+def _before_fork() -> None:
+    for cls, (policy, args, kwargs) in list(_policies.items()):
+        if policy == FORK_SHARE:
+            cls(*args, **kwargs)
+    # no thread may publish a class lock while the address space is copied
+    SingletonMeta._lock.acquire()
+
+
+def _after_fork_in_parent() -> None:
+    SingletonMeta._lock.release()
+
+
+def _after_fork_in_child() -> None:
+    # only the forking thread survives, locks held by the others would never
+    # be released in the child
+    SingletonMeta._lock = Lock()
+    SingletonMeta._locks.clear()
+
+    for cls, (policy, args, kwargs) in list(_policies.items()):
+        if policy in (FORK_RESET, FORK_REBUILD):
+            SingletonMeta._instances.pop(cls, None)
+        if policy == FORK_REBUILD:
+            cls(*args, **kwargs)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork,
+                        after_in_parent=_after_fork_in_parent,
+                        after_in_child=_after_fork_in_child)
+
+
+class SlowResource(metaclass=SingletonMeta):
+    def __init__(self, setup_delay: float = 0.05) -> None:
+        sleep(setup_delay)
+        self.pid = os.getpid()
+
+
+def _first_request(connection, forked_at: float) -> None:
+    started = perf_counter()
+    resource = SlowResource()
+    latency = perf_counter() - started
+    connection.send((latency, monotonic() - forked_at, resource.pid == os.getpid()))
+
+
+def benchmark_first_request() -> None:
+    context = multiprocessing.get_context("fork")
+    for policy in (None, FORK_RESET, FORK_REBUILD, FORK_SHARE):
+        SingletonMeta._instances.pop(SlowResource, None)
+        unregister_fork_policy(SlowResource)
+        if policy is not None:
+            SlowResource()
+            register_fork_policy(SlowResource, policy)
+
+        receiver, sender = context.Pipe(duplex=False)
+        child = context.Process(target=_first_request, args=(sender, monotonic()))
+        child.start()
+        latency, ready_after, own = receiver.recv()
+        child.join()
+
+        print(f"Benchmark: policy={policy or 'lazy':8} first request {latency * 1e3:7.2f}ms, "
+              f"answered {ready_after * 1e3:7.2f}ms after fork, "
+              f"instance built in the child: {own}")
+
+
+def _show_connection(connection) -> None:
+    connection.send(Connection("con://child:pass").url)
+
+
+if __name__ == "__main__":
+    register_fork_policy(Connection, FORK_RESET)
+    print(f"Parent: {Connection('con://parent:pass').url}")
+
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(target=_show_connection, args=(sender,))
+    child.start()
+    print(f"Child: {receiver.recv()}")
+    child.join()
+    print("")
+
+    benchmark_first_request()
@@ -1,30 +1,120 @@
-from threading import Lock, Thread
+from threading import Barrier, Lock, Thread
+from time import perf_counter
+from typing import Any, Dict, Hashable, List, Optional
+
+from creational.naive_singleton import MultitonMeta
 
 
 class SingletonMeta(type):
     _instances = {}
 
     _lock: Lock = Lock()
+    _locks: Dict[type, Lock] = {}
 
     def __call__(cls, *args, **kwargs):
-        """we will lock instance initialization so it would not create many instances in multiple threads"""
-        with Lock():
+        """
+        Double-checked locking: an already created instance is returned without
+        taking any lock, the first construction is guarded by a per-class lock
+        so unrelated singleton classes never wait for each other.
+        """
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
+
+        with cls._get_class_lock():
             if cls not in cls._instances:
-                instance = super().__call__(*args, **kwargs)
-                cls._instances[cls] = instance
+                cls._instances[cls] = super().__call__(*args, **kwargs)
         return cls._instances[cls]
 
+    def _get_class_lock(cls) -> Lock:
+        lock = cls._locks.get(cls)
+        if lock is None:
+            # the global lock is held only to publish the per-class lock once
+            with SingletonMeta._lock:
+                lock = cls._locks.setdefault(cls, Lock())
+        return lock
+
+
+class ThreadSafeMultitonMeta(MultitonMeta):
+    """
+    Registry operations run under a per-class lock, while construction is
+    serialized per key, so a slow endpoint does not block the others.
+    """
+
+    def __init__(cls, name, bases, namespace, maxsize: Optional[int] = None,
+                 weak: bool = False, **kwargs) -> None:
+        super().__init__(name, bases, namespace, maxsize=maxsize, weak=weak, **kwargs)
+        cls._multiton_lock = Lock()
+        cls._multiton_key_locks: Dict[Hashable, Lock] = {}
+
+    def __call__(cls, *args, **kwargs):
+        key = cls._make_key(args, kwargs)
+        with cls._multiton_lock:
+            instance = cls._lookup(key)
+            if instance is not None:
+                return instance
+            key_lock = cls._multiton_key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            with cls._multiton_lock:
+                instance = cls._lookup(key)
+            if instance is None:
+                instance = type.__call__(cls, *args, **kwargs)
+                with cls._multiton_lock:
+                    cls._store(key, instance)
+
+        with cls._multiton_lock:
+            if cls._multiton_key_locks.get(key) is key_lock:
+                del cls._multiton_key_locks[key]
+        return instance
+
 
 class Connection(metaclass=SingletonMeta):
     def __init__(self, url: str) -> None:
         self.url = url
 
 
+class EndpointConnection(metaclass=ThreadSafeMultitonMeta, maxsize=128, weak=True):
+    """One connection per endpoint, dropped once nobody uses it"""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+
 def test_singleton(url: str) -> None:
     singleton = Connection(url)
     print(singleton.url)
 
 
+def benchmark_contention(threads: int = 32, calls: int = 10_000) -> None:
+    """Hammers `Connection(...)` from many threads started at the same moment"""
+    SingletonMeta._instances.pop(Connection, None)
+    barrier = Barrier(threads)
+    seen: List[List[Connection]] = [[] for _ in range(threads)]
+
+    def worker(index: int) -> None:
+        url = f"con://worker:{index}"
+        instances = seen[index]
+        barrier.wait()
+        for _ in range(calls):
+            instances.append(Connection(url))
+
+    workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = perf_counter() - start
+
+    built = len({id(instance) for instances in seen for instance in instances})
+    total = threads * calls
+    print(f"Benchmark: {threads} threads x {calls} calls = {total} lookups "
+          f"in {elapsed:.3f}s ({total / elapsed:,.0f} lookups/s), "
+          f"instances built: {built}")
+    assert built == 1, "more than one Connection was built"
+
+
 if __name__ == "__main__":
     print("If you see the sa rent values, "
           "then 2 singletons were created (booo!!)\n\n"
@@ -34,3 +124,21 @@ if __name__ == "__main__":
     thread2 = Thread(target=test_singleton, args=("con://wow:omg",))
     thread1.start()
     thread2.start()
+    thread1.join()
+    thread2.join()
+
+    print("")
+    benchmark_contention()
+
+    print("")
+    endpoints: List[Any] = []
+    url_threads = [
+        Thread(target=lambda u=url: endpoints.append(EndpointConnection(u)))
+        for url in ("con://name:pass", "con://wow:omg") * 8
+    ]
+    for thread in url_threads:
+        thread.start()
+    for thread in url_threads:
+        thread.join()
+    print(f"EndpointConnection: {len(set(map(id, endpoints)))} instances "
+          f"for {len(set(e.url for e in endpoints))} urls")
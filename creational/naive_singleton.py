@@ -1,3 +1,9 @@
+import inspect
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
 class SingletonMeta(type):
     _instances = {}
 
@@ -8,11 +14,111 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 
+class MultitonMeta(type):
+    """
+    Multiton keeps one instance per normalized set of constructor arguments.
+    The registry is configured with class keywords:
+
+        class Endpoint(metaclass=MultitonMeta, maxsize=128, weak=True): ...
+
+    `maxsize` bounds the registry and evicts the least recently used instance,
+    `weak` keeps instances only while somebody else references them.
+    """
+
+    def __new__(mcs, name, bases, namespace, maxsize: Optional[int] = None,
+                weak: bool = False, **kwargs):
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+    def __init__(cls, name, bases, namespace, maxsize: Optional[int] = None,
+                 weak: bool = False, **kwargs) -> None:
+        super().__init__(name, bases, namespace, **kwargs)
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be a positive number or None")
+        cls._multiton_maxsize = maxsize
+        cls._multiton_weak = weak
+        cls._multiton_entries: OrderedDict = OrderedDict()
+        cls._multiton_dead: List[Tuple[Hashable, weakref.ref]] = []
+        cls._multiton_signature = None
+
+    def __call__(cls, *args, **kwargs):
+        key = cls._make_key(args, kwargs)
+        instance = cls._lookup(key)
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            cls._store(key, instance)
+        return instance
+
+    def _make_key(cls, args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+        """`Endpoint("a")` and `Endpoint(url="a")` must share one instance"""
+        signature = cls._multiton_signature
+        if signature is None:
+            signature = inspect.signature(cls.__init__)
+            parameters = list(signature.parameters.values())[1:]
+            signature = cls._multiton_signature = signature.replace(parameters=parameters)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = []
+        for name, value in bound.arguments.items():
+            if signature.parameters[name].kind is inspect.Parameter.VAR_KEYWORD:
+                value = tuple(sorted(value.items()))
+            key.append((name, value))
+        key = tuple(key)
+
+        try:
+            hash(key)
+        except TypeError:
+            raise TypeError(f"{cls.__name__} multiton arguments must be hashable") from None
+        return key
+
+    def _lookup(cls, key: Hashable) -> Any:
+        cls._purge()
+        entries = cls._multiton_entries
+        entry = entries.get(key)
+        if entry is None:
+            return None
+
+        instance = entry() if cls._multiton_weak else entry
+        if instance is None:
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return instance
+
+    def _store(cls, key: Hashable, instance: Any) -> None:
+        entries = cls._multiton_entries
+        if cls._multiton_weak:
+            dead = cls._multiton_dead
+            # the callback may fire at any moment, so it only records the key
+            entries[key] = weakref.ref(instance, lambda ref: dead.append((key, ref)))
+        else:
+            entries[key] = instance
+        entries.move_to_end(key)
+
+        maxsize = cls._multiton_maxsize
+        while maxsize is not None and len(entries) > maxsize:
+            entries.popitem(last=False)
+
+    def _purge(cls) -> None:
+        entries = cls._multiton_entries
+        dead = cls._multiton_dead
+        while dead:
+            key, ref = dead.pop()
+            if entries.get(key) is ref:
+                del entries[key]
+
+
 class Connection(metaclass=SingletonMeta):
     def ping(self) -> None:
         print("This method checks the connection stability")
 
 
+class Endpoint(metaclass=MultitonMeta, maxsize=2):
+    def __init__(self, url: str, timeout: int = 30) -> None:
+        self.url = url
+        self.timeout = timeout
+
+
 if __name__ == "__main__":
     s1 = Connection()
     s2 = Connection()
@@ -23,3 +129,15 @@ if __name__ == "__main__":
         print("Connection failed, variables contain different instances.")
     s1.ping()
     s2.ping()
+
+    print("")
+
+    e1 = Endpoint("con://name:pass")
+    e2 = Endpoint(url="con://name:pass", timeout=30)
+    e3 = Endpoint("con://wow:omg")
+    print(f"Endpoint: same url gives the same instance: {e1 is e2}")
+    print(f"Endpoint: another url gives another instance: {e1 is not e3}")
+
+    Endpoint("con://third:one")
+    print(f"Endpoint: least recently used instance was evicted: "
+          f"{Endpoint('con://name:pass') is not e1}")
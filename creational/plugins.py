@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import importlib
+import os
+import re
+import subprocess
+import sys
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, Tuple
+
+# group -> plugin name -> "module:attribute", nothing is imported until asked for
+MANIFEST: Dict[str, Dict[str, str]] = {
+    "logistic": {
+        "road": "creational.factory_method:RoadLogistic",
+        "sea": "creational.factory_method:SeaLogistic",
+        "heavy_road": "creational.factory_method:HeavyRoadLogistic",
+    },
+    "furniture": {
+        "modern": "creational.abstract_factory:ModernFurnitureFactory",
+        "victorian": "creational.abstract_factory:VictorianFurnitureFactory",
+    },
+    "house_builder": {
+        "garage": "creational.builder:HouseWithGarageBuilder",
+        "swimming_pool": "creational.builder:HouseWithSwimmingPool",
+    },
+}
+
+
+class PluginRegistry:
+    """
+    Maps plugin names to factory classes declared in a manifest. A plugin's
+    module is imported on the first lookup, the class is cached and the time
+    spent importing it is kept in `import_times`.
+    """
+
+    def __init__(self, manifest: Dict[str, Dict[str, str]]) -> None:
+        self._manifest = manifest
+        self._resolved: Dict[Tuple[str, str], Any] = {}
+        self._lock = Lock()
+        self.import_times: Dict[Tuple[str, str], float] = {}
+
+    def names(self, group: str) -> Tuple[str, ...]:
+        return tuple(self._manifest[group])
+
+    def resolve(self, group: str, name: str) -> Any:
+        resolved = self._resolved.get((group, name))
+        if resolved is not None:
+            return resolved
+
+        try:
+            target = self._manifest[group][name]
+        except KeyError:
+            raise LookupError(f"no plugin {name!r} in group {group!r}") from None
+        module_name, _, attribute = target.partition(":")
+
+        with self._lock:
+            resolved = self._resolved.get((group, name))
+            if resolved is None:
+                started = perf_counter()
+                resolved = getattr(importlib.import_module(module_name), attribute)
+                self.import_times[(group, name)] = perf_counter() - started
+                self._resolved[(group, name)] = resolved
+        return resolved
+
+    def create(self, group: str, name: str, *args, **kwargs) -> Any:
+        return self.resolve(group, name)(*args, **kwargs)
+
+
+registry = PluginRegistry(MANIFEST)
+
+# the eager baseline imports every plugin module of the manifest up front
+_EAGER = "import " + ", ".join(sorted({target.partition(":")[0]
+                                       for plugins in MANIFEST.values()
+                                       for target in plugins.values()}))
+_LAZY = "from creational.plugins import registry; registry.create('logistic', 'road')"
+
+
+def _import_time(code: str) -> Tuple[float, float]:
+    """Runs `python -X importtime` and sums the self time of every import, in ms"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    started = perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=root, capture_output=True, text=True, check=True)
+    elapsed = perf_counter() - started
+    self_times = re.findall(r"^import time:\s+(\d+) \|", result.stderr, re.MULTILINE)
+    return sum(map(int, self_times)) / 1e3, elapsed * 1e3
+
+
+def benchmark_imports(runs: int = 5) -> None:
+    for label, code in (("eager", _EAGER), ("lazy", _LAZY)):
+        imports, process = map(min, zip(*(_import_time(code) for _ in range(runs))))
+        print(f"Benchmark: {label:5} imports {imports:7.1f}ms, whole process {process:7.1f}ms "
+              f"(best of {runs})")
+
+
+if __name__ == "__main__":
+    for group in MANIFEST:
+        print(f"Plugins in {group!r}: {', '.join(registry.names(group))}")
+
+    print(registry.create("logistic", "sea").plan_delivery())
+    print(registry.create("furniture", "victorian").create_chair().sit())
+    for (group, name), seconds in registry.import_times.items():
+        print(f"Import of {group}/{name} took {seconds * 1e3:.2f}ms")
+    print("")
+
+    benchmark_imports()
@@ -42,7 +42,7 @@ class SomeComponent:
 
         return new
 
-    def __deepcopy__(self, memo={}):
+    def __deepcopy__(self, memo=None):
         """
         Create a deep copy. This method will be called whenever someone calls
         `copy.deepcopy` with this object and the returned value is returned as
@@ -52,8 +52,11 @@ class SomeComponent:
         used by the `deepcopy` library to prevent infinite recursive copies in
         instances of circular references. Pass it to all the `deepcopy` calls
         you make in the `__deepcopy__` implementation to prevent infinite
-        recursions.
+        recursions. It must not default to a shared mutable `{}`: that dict
+        would outlive the call and leak copies between unrelated deepcopies.
         """
+        if memo is None:
+            memo = {}
 
         # First, let's create copies of the nested objects.
         some_list_of_objects = copy.deepcopy(self.some_list_of_objects, memo)
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import copy
+import gc
+from abc import abstractmethod
+import tracemalloc
+from collections.abc import MutableMapping, MutableSequence, MutableSet
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from creational.prototype import SelfReferencingEntity, SomeComponent
+
+_ATOMIC = (type(None), bool, int, float, complex, str, bytes, range)
+
+
+def _is_immutable(value: Any) -> bool:
+    if isinstance(value, _ATOMIC):
+        return True
+    if type(value) in (tuple, frozenset):
+        return all(_is_immutable(item) for item in value)
+    return False
+
+
+def _is_data_tree(value: Any) -> bool:
+    """Lists, dicts and sets of immutable values can be shared copy-on-write"""
+    if type(value) in (list, set):
+        return all(_is_data_tree(item) for item in value)
+    if type(value) is dict:
+        return all(_is_data_tree(item) for item in value.values())
+    return _is_immutable(value)
+
+
+def _wrap(value: Any, parent: Optional[_CopyOnWrite] = None) -> Any:
+    container = _COPY_ON_WRITE.get(type(value))
+    return value if container is None else container(value, parent)
+
+
+class _CopyOnWrite:
+    """
+    Shares `source` with the prototype until the first mutation, then makes a
+    shallow copy of it. Nested containers are wrapped on read, and when one of
+    them is copied the parent copies itself too and swaps the nested source
+    for the new copy, so the prototype never sees the change.
+
+    The wrappers implement the list, dict and set API but are not subclasses
+    of the built-in types: `isinstance(value, list)` is False and `json`
+    does not serialize them. `copy()` returns a plain container detached
+    from the prototype for such uses.
+    """
+
+    __slots__ = ("_data", "_owned", "_parent", "_children")
+
+    def __init__(self, source: Any, parent: Optional[_CopyOnWrite] = None) -> None:
+        self._data = source
+        self._owned = False
+        self._parent = parent
+        self._children: Optional[Dict[int, _CopyOnWrite]] = None
+
+    def _child(self, value: Any) -> Any:
+        if type(value) not in _COPY_ON_WRITE:
+            return value
+        children = self._children
+        if children is None:
+            children = self._children = {}
+        child = children.get(id(value))
+        if child is None or child._data is not value:
+            child = children[id(value)] = _wrap(value, self)
+        return child
+
+    def _own(self) -> None:
+        if self._owned:
+            return
+        source, self._data = self._data, copy.copy(self._data)
+        self._owned = True
+        if self._parent is not None:
+            self._parent._replace(source, self)
+
+    def _replace(self, source: Any, child: _CopyOnWrite) -> None:
+        self._own()
+        self._replace_item(source, child._data)
+        self._children.pop(id(source), None)
+        self._children[id(child._data)] = child
+
+    @abstractmethod
+    def _replace_item(self, old: Any, new: Any) -> None:
+        """Points the owned data at the private copy `new` of the nested `old`"""
+
+    def _unwrap(self, value: Any) -> Any:
+        return value._data if isinstance(value, _CopyOnWrite) else value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator:
+        return map(self._child, self._data)
+
+    def __contains__(self, value: Any) -> bool:
+        return self._unwrap(value) in self._data
+
+    def __eq__(self, other: Any) -> bool:
+        return self._data == self._unwrap(other)
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def __copy__(self) -> _CopyOnWrite:
+        # the default copy would share `_data` and `_owned` with this wrapper
+        if not self._owned:
+            return type(self)(self._data)
+        duplicate = type(self)(copy.copy(self._data))
+        duplicate._owned = True
+        return duplicate
+
+    def __deepcopy__(self, memo: Dict) -> Any:
+        return copy.deepcopy(self._data, memo)
+
+    def copy(self) -> Any:
+        # the nested containers may still be the prototype's own ones
+        return copy.deepcopy(self._data)
+
+    __hash__ = None
+
+
+class CopyOnWriteList(_CopyOnWrite, MutableSequence):
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(map(self._child, self._data[index]))
+        return self._child(self._data[index])
+
+    def __setitem__(self, index, value) -> None:
+        self._own()
+        self._data[index] = self._unwrap(value)
+
+    def __delitem__(self, index) -> None:
+        self._own()
+        del self._data[index]
+
+    def insert(self, index: int, value: Any) -> None:
+        self._own()
+        self._data.insert(index, self._unwrap(value))
+
+    def sort(self, *, key=None, reverse: bool = False) -> None:
+        self._own()
+        self._data.sort(key=key, reverse=reverse)
+
+    def reverse(self) -> None:
+        self._own()
+        self._data.reverse()
+
+    def __add__(self, other: Any) -> list:
+        if not isinstance(other, (list, CopyOnWriteList)):
+            return NotImplemented
+        return self.copy() + copy.deepcopy(self._unwrap(other))
+
+    def __radd__(self, other: Any) -> list:
+        if not isinstance(other, list):
+            return NotImplemented
+        return other + self.copy()
+
+    def __mul__(self, count: int) -> list:
+        return self.copy() * count
+
+    __rmul__ = __mul__
+
+    def __imul__(self, count: int) -> CopyOnWriteList:
+        self._own()
+        self._data *= count
+        return self
+
+    def __lt__(self, other: Any) -> bool:
+        return self._data < self._unwrap(other)
+
+    def __le__(self, other: Any) -> bool:
+        return self._data <= self._unwrap(other)
+
+    def __gt__(self, other: Any) -> bool:
+        return self._data > self._unwrap(other)
+
+    def __ge__(self, other: Any) -> bool:
+        return self._data >= self._unwrap(other)
+
+    def _replace_item(self, old: Any, new: Any) -> None:
+        data = self._data
+        for index, item in enumerate(data):
+            if item is old:
+                data[index] = new
+
+
+class CopyOnWriteDict(_CopyOnWrite, MutableMapping):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self._child(self._data[key])
+
+    def __setitem__(self, key, value) -> None:
+        self._own()
+        self._data[key] = self._unwrap(value)
+
+    def __delitem__(self, key) -> None:
+        self._own()
+        del self._data[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __or__(self, other: Any) -> dict:
+        if not isinstance(other, (dict, CopyOnWriteDict)):
+            return NotImplemented
+        return self.copy() | copy.deepcopy(self._unwrap(other))
+
+    def __ror__(self, other: Any) -> dict:
+        if not isinstance(other, dict):
+            return NotImplemented
+        return other | self.copy()
+
+    def __ior__(self, other: Any) -> CopyOnWriteDict:
+        self.update(other)
+        return self
+
+    def _replace_item(self, old: Any, new: Any) -> None:
+        data = self._data
+        for key, item in data.items():
+            if item is old:
+                data[key] = new
+
+
+class CopyOnWriteSet(_CopyOnWrite, MutableSet):
+    __slots__ = ()
+
+    def add(self, value: Any) -> None:
+        if value not in self._data:
+            self._own()
+            self._data.add(value)
+
+    def discard(self, value: Any) -> None:
+        if value in self._data:
+            self._own()
+            self._data.discard(value)
+
+    def update(self, *others: Iterable) -> None:
+        for other in others:
+            self |= other
+
+    def intersection_update(self, *others: Iterable) -> None:
+        for other in others:
+            self &= set(other)
+
+    def difference_update(self, *others: Iterable) -> None:
+        for other in others:
+            self -= other
+
+    def symmetric_difference_update(self, other: Iterable) -> None:
+        self ^= set(other)
+
+    def union(self, *others: Iterable) -> set:
+        return self._data.union(*others)
+
+    def intersection(self, *others: Iterable) -> set:
+        return self._data.intersection(*others)
+
+    def difference(self, *others: Iterable) -> set:
+        return self._data.difference(*others)
+
+    def symmetric_difference(self, other: Iterable) -> set:
+        return self._data.symmetric_difference(other)
+
+    def issubset(self, other: Iterable) -> bool:
+        return self._data.issubset(other)
+
+    def issuperset(self, other: Iterable) -> bool:
+        return self._data.issuperset(other)
+
+    def _replace_item(self, old: Any, new: Any) -> None:
+        # members of a set are hashable, so none of them is ever wrapped
+        pass
+
+    @classmethod
+    def _from_iterable(cls, iterable) -> set:
+        return set(iterable)
+
+
+_COPY_ON_WRITE = {list: CopyOnWriteList, dict: CopyOnWriteDict, set: CopyOnWriteSet}
+
+
+class PrototypeRegistry:
+    """
+    Keeps named prototypes and clones them. Attributes are classified once, at
+    registration: atomic values are shared, trees of plain containers are
+    shared copy-on-write, everything else is deep copied on every clone with
+    the prototype mapped to the clone, so back references point to the clone.
+    """
+
+    def __init__(self) -> None:
+        self._prototypes: Dict[str, Any] = {}
+        self._plans: Dict[str, Dict[str, str]] = {}
+
+    def register(self, name: str, prototype: Any) -> None:
+        """
+        The registry takes ownership of `prototype`: clones share its data
+        until they mutate it, so it must not be changed after registration.
+        """
+        plan = {}
+        for attribute, value in vars(prototype).items():
+            if _is_immutable(value):
+                plan[attribute] = "share"
+            elif type(value) in _COPY_ON_WRITE and _is_data_tree(value):
+                plan[attribute] = "copy_on_write"
+            else:
+                plan[attribute] = "deepcopy"
+        self._prototypes[name] = prototype
+        self._plans[name] = plan
+
+    def unregister(self, name: str) -> None:
+        del self._prototypes[name]
+        del self._plans[name]
+
+    def clone(self, name: str, **overrides: Any) -> Any:
+        prototype = self._prototypes[name]
+        clone = object.__new__(type(prototype))
+        memo = None
+        state = {}
+        for attribute, strategy in self._plans[name].items():
+            value = prototype.__dict__[attribute]
+            if strategy == "copy_on_write":
+                value = _wrap(value)
+            elif strategy == "deepcopy":
+                if memo is None:
+                    memo = {id(prototype): clone}
+                value = copy.deepcopy(value, memo)
+            state[attribute] = value
+        state.update(overrides)
+        clone.__dict__.update(state)
+        return clone
+
+
+def _make_template(size: int) -> SomeComponent:
+    items = [[i, str(i), {"id": i, "tags": [i, i + 1]}] for i in range(size)]
+    circular_ref = SelfReferencingEntity()
+    component = SomeComponent(23, items, circular_ref)
+    circular_ref.set_parent(component)
+    return component
+
+
+def benchmark_clones(clones: int = 1_000, size: int = 1_000) -> None:
+    template = _make_template(size)
+    registry = PrototypeRegistry()
+    registry.register("template", template)
+
+    strategies = (("copy.deepcopy", lambda: copy.deepcopy(template)),
+                  ("registry.clone", lambda: registry.clone("template")))
+    timings = {}
+    for label, clone in strategies:
+        # clones are cyclic, collect the previous round outside of the timing
+        gc.collect()
+        started = perf_counter()
+        kept = [clone() for _ in range(clones)]
+        timings[label] = perf_counter() - started
+        del kept
+
+    # tracemalloc slows down every allocation made while it runs, so memory is
+    # measured only after all timings are taken
+    for label, clone in strategies:
+        gc.collect()
+        tracemalloc.start()
+        kept = [clone() for _ in range(clones)]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        print(f"Benchmark: {label:15} {clones} clones of a {size} item template: "
+              f"{timings[label] / clones * 1e6:9.1f}us per clone, "
+              f"{memory / clones / 1024:8.1f}KiB per clone")
+
+
+if __name__ == "__main__":
+    registry = PrototypeRegistry()
+    registry.register("component", _make_template(3))
+
+    first = registry.clone("component")
+    second = registry.clone("component", some_int=42)
+    first.some_list_of_objects[1][2]["tags"].append("first only")
+
+    print(f"Clone 1 tags: {first.some_list_of_objects[1][2]['tags']}")
+    print(f"Clone 2 tags: {second.some_list_of_objects[1][2]['tags']}, some_int={second.some_int}")
+    print(f"Clone 2 still shares the untouched list: "
+          f"{second.some_list_of_objects._data is registry._prototypes['component'].some_list_of_objects}")
+    print(f"Back reference points to the clone: {first.some_circular_ref.parent is first}")
+    shallow = copy.copy(first.some_list_of_objects)
+    shallow.append("shallow only")
+    print(f"A shallow copy of a mutated clone is independent: "
+          f"{first.some_list_of_objects[-1] != 'shallow only'}\n")
+
+    benchmark_clones()
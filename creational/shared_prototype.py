@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import pickle
+import struct
+from array import array
+from collections.abc import MutableSequence
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from creational.prototype import SelfReferencingEntity, SomeComponent
+
+
+_ATOMIC = (type(None), bool, int, float, complex, str, bytes)
+
+
+def _is_plain_data(value: Any) -> bool:
+    """Values that can be pickled one by one without losing shared references"""
+    if isinstance(value, _ATOMIC):
+        return True
+    if type(value) in (list, tuple, set, frozenset):
+        return all(_is_plain_data(item) for item in value)
+    if type(value) is dict:
+        return all(_is_plain_data(key) and _is_plain_data(item) for key, item in value.items())
+    return False
+
+
+class _Table:
+    """Stands for a lazily decoded list in the published skeleton"""
+
+    def __init__(self, offset: int, count: int) -> None:
+        self.offset = offset
+        self.count = count
+
+
+_OFFSETS = struct.Struct("<QQ")
+
+
+class SharedList(MutableSequence):
+    """
+    A list read in place from a shared block: an item is unpickled the first
+    time it is read and kept, the others stay in the shared pages. The first
+    change decodes the rest into a private list and stops reading the block.
+    The list holds no view of the block, so it can be closed at any time;
+    unchanged lists then fail on reading items not decoded yet.
+    """
+
+    def __init__(self, shared: SharedPrototype, offset: int, count: int) -> None:
+        self._shared: Optional[SharedPrototype] = shared
+        self._offset = offset
+        self._count = count
+        self._decoded: Dict[int, Any] = {}
+        self._items: Optional[List[Any]] = None
+
+    def __len__(self) -> int:
+        return self._count if self._items is None else len(self._items)
+
+    def __getitem__(self, index):
+        if self._items is not None:
+            return self._items[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("list index out of range")
+        if index not in self._decoded:
+            tables = self._shared._tables
+            start, end = _OFFSETS.unpack_from(tables, self._offset + 8 * index)
+            self._decoded[index] = pickle.loads(tables[start:end])
+        return self._decoded[index]
+
+    def __setitem__(self, index, value) -> None:
+        self._materialize()[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self._materialize()[index]
+
+    def insert(self, index: int, value: Any) -> None:
+        self._materialize().insert(index, value)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, (list, SharedList)) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    __hash__ = None
+
+    def _materialize(self) -> List[Any]:
+        if self._items is None:
+            self._items = [self[i] for i in range(len(self))]
+            self._decoded = {}
+            self._shared = None
+        return self._items
+
+
+class _SkeletonPickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, prototype: Any) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._prototype = prototype
+
+    def persistent_id(self, obj: Any) -> Any:
+        if obj is self._prototype:
+            return "prototype"
+        if type(obj) is _Table:
+            return "table", obj.offset, obj.count
+        return None
+
+
+class _SkeletonUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, shared: SharedPrototype) -> None:
+        super().__init__(file)
+        self._shared = shared
+        self.clone: Any = None
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == "prototype":
+            return self.clone
+        _, offset, count = pid
+        return SharedList(self._shared, offset, count)
+
+
+class SharedPrototype:
+    """
+    A prototype published once into `multiprocessing.shared_memory`. Every
+    top level list of plain data is stored item by item behind an offset
+    table, the rest of the prototype as a small pickle with references to
+    the prototype itself kept symbolic. A clone unpickles only that rest and
+    gets a SharedList per stored list, so a worker decodes the items it
+    reads and the others are never copied out of the shared pages.
+
+    Unchanged lists of a clone keep reading the block, keep it attached
+    while they are in use.
+    """
+
+    # skeleton length, start of the tables, used size of the block
+    _header = struct.Struct("<QQQ")
+
+    def __init__(self, memory: SharedMemory, owner: bool) -> None:
+        self._memory = memory
+        self._owner = owner
+        skeleton_size, tables_start, self._size = self._header.unpack_from(memory.buf)
+        self._skeleton = memory.buf[self._header.size:self._header.size + skeleton_size]
+        self._tables = memory.buf[tables_start:self._size]
+
+    @classmethod
+    def publish(cls, prototype: Any, name: Optional[str] = None) -> SharedPrototype:
+        state = dict(vars(prototype))
+        tables = bytearray()
+        for attribute, value in state.items():
+            if type(value) is not list or not _is_plain_data(value):
+                continue
+            items = [pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL) for item in value]
+            offset = len(tables)
+            offsets = array("Q", [offset + 8 * (len(items) + 1)])
+            for item in items:
+                offsets.append(offsets[-1] + len(item))
+            tables += offsets.tobytes()
+            tables += b"".join(items)
+            # the next offset table must stay 8 byte aligned
+            tables += bytes(-len(tables) % 8)
+            state[attribute] = _Table(offset, len(items))
+
+        skeleton = io.BytesIO()
+        pickler = _SkeletonPickler(skeleton, prototype)
+        pickler.dump(type(prototype))
+        pickler.dump(state)
+        skeleton = skeleton.getvalue()
+
+        tables_start = cls._header.size + len(skeleton)
+        tables_start += -tables_start % 8
+        size = tables_start + len(tables)
+        memory = SharedMemory(name=name, create=True, size=size)
+        cls._header.pack_into(memory.buf, 0, len(skeleton), tables_start, size)
+        memory.buf[cls._header.size:cls._header.size + len(skeleton)] = skeleton
+        memory.buf[tables_start:size] = tables
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedPrototype:
+        try:
+            # the publisher owns the block, a worker's resource tracker must
+            # not unlink it when the worker exits
+            memory = SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching always registers the block; child
+            # processes share the parent's tracker, for which that is a no-op
+            memory = SharedMemory(name=name)
+        return cls(memory, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def clone(self) -> Any:
+        unpickler = _SkeletonUnpickler(io.BytesIO(self._skeleton), self)
+        clone = unpickler.clone = object.__new__(unpickler.load())
+        clone.__dict__.update(unpickler.load())
+        return clone
+
+    def clone_many(self, n: int) -> List[Any]:
+        return [self.clone() for _ in range(n)]
+
+    def close(self) -> None:
+        self._skeleton.release()
+        self._tables.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def __enter__(self) -> SharedPrototype:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _memory_usage() -> Dict[str, int]:
+    """Resident and proportional set size in KiB, PSS splits shared pages between processes"""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _make_prototype(size: int) -> SomeComponent:
+    circular_ref = SelfReferencingEntity()
+    items = [[i, f"item-{i}", {"id": i, "tags": ["a", "b"]}] for i in range(size)]
+    component = SomeComponent(23, items, circular_ref)
+    circular_ref.set_parent(component)
+    return component
+
+
+def _pipe_worker(payload: bytes, started: float, results) -> None:
+    # the pickle arrives through the pipe and is loaded once, as from shared memory
+    clone = pickle.loads(payload)
+    results.put(("pipe", perf_counter() - started, _memory_usage(), len(clone.some_list_of_objects)))
+
+
+def _shared_worker(name: str, started: float, results) -> None:
+    shared = SharedPrototype.attach(name)
+    clone = shared.clone()
+    # a worker typically serves a part of the items, here the first thousand
+    served = sum(item[0] for item in clone.some_list_of_objects[:1000])
+    results.put(("shared", perf_counter() - started, _memory_usage(), len(clone.some_list_of_objects)))
+    del clone, served
+    shared.close()
+
+
+def benchmark_workers(processes: int = 8, size: int = 100_000) -> None:
+    """Each spawned worker makes one clone of the prototype and reports its memory"""
+    context = multiprocessing.get_context("spawn")
+    prototype = _make_prototype(size)
+
+    with SharedPrototype.publish(prototype) as shared:
+        print(f"Benchmark: prototype with {size} items takes {shared.size / 2 ** 20:.1f}MiB "
+              f"of shared memory")
+        payload = pickle.dumps(prototype, protocol=pickle.HIGHEST_PROTOCOL)
+        for label, target, argument in (("pipe", _pipe_worker, payload),
+                                        ("shared", _shared_worker, shared.name)):
+            results = context.Queue()
+            started = perf_counter()
+            workers = [context.Process(target=target, args=(argument, perf_counter(), results))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            reports = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            elapsed = perf_counter() - started
+
+            startup = sum(report[1] for report in reports) / processes
+            rss = sum(report[2].get("Rss", 0) for report in reports) / 1024
+            pss = sum(report[2].get("Pss", 0) for report in reports) / 1024
+            print(f"Benchmark: {label:6} {processes} workers ready in {elapsed:.2f}s, "
+                  f"mean worker startup {startup * 1e3:.0f}ms, "
+                  f"total RSS {rss:.0f}MiB, total PSS {pss:.0f}MiB")
+
+
+if __name__ == "__main__":
+    with SharedPrototype.publish(_make_prototype(3)) as shared:
+        worker_view = SharedPrototype.attach(shared.name)
+        first, second = worker_view.clone_many(2)
+        first.some_list_of_objects.append("only in the first clone")
+
+        print(f"Shared block {shared.name!r} holds {shared.size} bytes")
+        print(f"Clones are independent: {len(first.some_list_of_objects)} != "
+              f"{len(second.some_list_of_objects)}")
+        print(f"Back reference points to the clone: {first.some_circular_ref.parent is first}\n")
+        worker_view.close()
+
+    benchmark_workers()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter
+from typing import Any, List, Optional, Tuple
+
+
+class FakeBatchBackend:
+    """Downstream service: every call costs `call_delay` plus `item_delay` per item"""
+
+    def __init__(self, call_delay: float = 0.005, item_delay: float = 0.0001) -> None:
+        self._call_delay = call_delay
+        self._item_delay = item_delay
+        self.calls = 0
+
+    async def request(self, item: Any) -> Any:
+        return (await self.request_batch([item]))[0]
+
+    async def request_batch(self, items: List[Any]) -> List[Any]:
+        self.calls += 1
+        await asyncio.sleep(self._call_delay + self._item_delay * len(items))
+        return [f"processed {item}" for item in items]
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average and bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must allow at least one acquisition")
+        self._rate = rate
+        # a slow bucket still has to hold the one token an acquisition takes
+        self._capacity = max(1.0, rate) if capacity is None else capacity
+        self._tokens = self._capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    elapsed = now - self._updated
+                    self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class AsyncProxy:
+    """Unbatched asyncio proxy: one rate limited backend call per request"""
+
+    def __init__(self, backend: FakeBatchBackend, rate: float) -> None:
+        self._backend = backend
+        self._bucket = TokenBucket(rate)
+
+    async def request(self, item: Any) -> Any:
+        await self._bucket.acquire()
+        return await self._backend.request(item)
+
+
+class BatchingProxy:
+    """
+    Collects `request` calls into batches of up to `max_batch_size` items,
+    waiting at most `max_wait` seconds for a batch to fill, and sends each
+    batch as one backend call limited to `rate` calls per second. At most
+    `queue_size` requests may wait; further callers are suspended until
+    there is room, which pushes the pressure back to them. The batching
+    task starts with the first request, or on entering `async with`.
+    """
+
+    def __init__(self, backend: FakeBatchBackend, rate: float, max_batch_size: int = 64,
+                 max_wait: float = 0.005, queue_size: int = 1024) -> None:
+        self._backend = backend
+        self._bucket = TokenBucket(rate)
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue[Tuple[Any, asyncio.Future]] = asyncio.Queue(queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def __aenter__(self) -> BatchingProxy:
+        self._start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def request(self, item: Any) -> Any:
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _start(self) -> None:
+        if self._closed:
+            raise RuntimeError("the proxy is closed")
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while True:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("the proxy was closed"))
+            # every item taken wakes a caller blocked in put(), let them enqueue
+            await asyncio.sleep(0)
+            if self._queue.empty():
+                return
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[Any, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self._max_wait
+                while len(batch) < self._max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # callers that gave up do not need a slot in the backend call
+                batch = [(item, future) for item, future in batch if not future.cancelled()]
+                if not batch:
+                    continue
+
+                await self._bucket.acquire()
+                try:
+                    results = await self._backend.request_batch([item for item, _ in batch])
+                    if len(results) != len(batch):
+                        raise RuntimeError(f"the backend returned {len(results)} results "
+                                           f"for {len(batch)} items")
+                except Exception as error:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # cancelled by close() while collecting or sending a batch
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("the proxy was closed"))
+
+
+async def benchmark_proxies(requests: int = 2_000, rate: float = 500) -> None:
+    async def run(label: str, proxy: Any, backend: FakeBatchBackend) -> None:
+        async def timed(item: int) -> float:
+            started = perf_counter()
+            await proxy.request(item)
+            return perf_counter() - started
+
+        started = perf_counter()
+        latencies = sorted(await asyncio.gather(*(timed(i) for i in range(requests))))
+        elapsed = perf_counter() - started
+        print(f"Benchmark: {label:9} {requests / elapsed:9,.0f} requests/s, "
+              f"{backend.calls:5} backend calls, p99 {latencies[int(requests * 0.99)] * 1e3:8.1f}ms")
+
+    backend = FakeBatchBackend()
+    await run("unbatched", AsyncProxy(backend, rate), backend)
+
+    backend = FakeBatchBackend()
+    async with BatchingProxy(backend, rate, queue_size=256) as proxy:
+        await run("batched", proxy, backend)
+
+
+async def main() -> None:
+    backend = FakeBatchBackend()
+    async with BatchingProxy(backend, rate=10, max_batch_size=4) as proxy:
+        results = await asyncio.gather(*(proxy.request(f"item {i}") for i in range(6)))
+    print(f"Client: {len(results)} requests, {backend.calls} backend calls: {results}\n")
+
+    await benchmark_proxies()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
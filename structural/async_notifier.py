@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from time import perf_counter
+from typing import List, Optional, Tuple, Union
+
+from structural.decorator import BaseNotifier, Decorator, FacebookDecorator, Notifier, SMSDecorator
+
+Outcome = Union[str, BaseException]
+
+
+class AsyncChannel(Decorator):
+    """
+    Decorator that also delivers the notification over a slow I/O channel.
+    This one is a local fake: it answers after `delay` seconds, or fails.
+    """
+
+    def __init__(self, component: BaseNotifier, delay: float = 0.05,
+                 error: Optional[BaseException] = None) -> None:
+        super().__init__(component)
+        self._delay = delay
+        self._error = error
+
+    async def send(self, message: str) -> str:
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        return f"delivered {message!r}"
+
+
+class SMSChannel(AsyncChannel, SMSDecorator):
+    pass
+
+
+class FacebookChannel(AsyncChannel, FacebookDecorator):
+    pass
+
+
+def channels(component: BaseNotifier) -> List[AsyncChannel]:
+    """Channels of a decorator chain, outermost first"""
+    found = []
+    while isinstance(component, Decorator):
+        if isinstance(component, AsyncChannel):
+            found.append(component)
+        component = component.component
+    return found
+
+
+async def notify_sequentially(component: BaseNotifier, message: str) -> List[Tuple[AsyncChannel, Outcome]]:
+    """What the plain decorator stack does: one channel after another"""
+    outcomes = []
+    for channel in channels(component):
+        try:
+            outcomes.append((channel, await channel.send(message)))
+        except Exception as error:
+            outcomes.append((channel, error))
+    return outcomes
+
+
+class FanOutNotifier(BaseNotifier):
+    """
+    Sends one notification to every channel of a decorator chain at once.
+    Each channel gets `timeout` seconds, at most `max_concurrency` sends run
+    together, and a failing or hanging channel only affects its own outcome.
+    """
+
+    def __init__(self, component: BaseNotifier, timeout: float = 1.0,
+                 max_concurrency: int = 100) -> None:
+        self._component = component
+        self._channels = channels(component)
+        self._timeout = timeout
+        self._max_concurrency = max_concurrency
+
+    def operation(self) -> str:
+        return self._component.operation()
+
+    async def notify(self, message: str) -> List[Tuple[AsyncChannel, Outcome]]:
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def send(channel: AsyncChannel) -> str:
+            async with semaphore:
+                return await asyncio.wait_for(channel.send(message), self._timeout)
+
+        outcomes = await asyncio.gather(*(send(channel) for channel in self._channels),
+                                        return_exceptions=True)
+        return list(zip(self._channels, outcomes))
+
+
+def _build_chain(count: int, rng: random.Random) -> BaseNotifier:
+    component: BaseNotifier = Notifier()
+    for index in range(count):
+        channel = SMSChannel if index % 2 else FacebookChannel
+        component = channel(component, delay=rng.uniform(0.02, 0.08))
+    return component
+
+
+async def benchmark_latency(counts: Tuple[int, ...] = (2, 10, 50)) -> None:
+    for count in counts:
+        component = _build_chain(count, random.Random(count))
+        notifier = FanOutNotifier(component, max_concurrency=16)
+        for label, notify in (("sequential", notify_sequentially(component, "hello")),
+                              ("fan-out", notifier.notify("hello"))):
+            started = perf_counter()
+            await notify
+            elapsed = perf_counter() - started
+            print(f"Benchmark: {count:3} channels, {label:10} {elapsed * 1e3:8.1f}ms")
+
+
+async def main() -> None:
+    component = SMSChannel(
+        FacebookChannel(
+            SMSChannel(Notifier(), delay=5),
+            delay=0.05, error=ConnectionError("Facebook is down")),
+        delay=0.05)
+    notifier = FanOutNotifier(component, timeout=0.2, max_concurrency=2)
+    print(f"Client: notifying through {notifier.operation()}")
+    for channel, outcome in await notifier.notify("hello"):
+        if isinstance(outcome, BaseException):
+            outcome = f"failed with {type(outcome).__name__} {outcome}".rstrip()
+        print(f"  {type(channel).__name__}: {outcome}")
+    print("")
+
+    await benchmark_latency()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import random
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter, sleep
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from structural.proxy import RealSubject, Subject
+
+
+class SlowRealSubject(RealSubject):
+    """Stand-in for an expensive backend: every request takes `delay` seconds"""
+
+    def __init__(self, delay: float = 0.02) -> None:
+        self._delay = delay
+        self._lock = Lock()
+        self.calls = 0
+
+    def request(self, key: Hashable = None) -> str:
+        with self._lock:
+            self.calls += 1
+        sleep(self._delay)
+        return f"RealSubject: result for {key!r}"
+
+
+class _Flight:
+    """One backend call in progress, identical requests wait for its result"""
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # set by invalidate() while the call runs, its result is then not cached
+        self.invalidated = False
+
+
+class CachingProxy(Subject):
+    """
+    Caches results of `real_subject.request(*args, **kwargs)` by arguments
+    for `ttl` seconds, keeping at most `maxsize` of them (least recently used
+    go first). Concurrent identical misses are coalesced into one backend
+    call. With `stale_ttl` an expired result is still served for that long
+    while a single background call refreshes it.
+    """
+
+    def __init__(self, real_subject: Subject, ttl: float = 1.0, maxsize: int = 1024,
+                 stale_ttl: float = 0.0) -> None:
+        self._real_subject = real_subject
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._stale_ttl = stale_ttl
+        self._cache: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0}
+
+    @staticmethod
+    def _key(args: Tuple, kwargs: Dict[str, Any]) -> Hashable:
+        return args, tuple(sorted(kwargs.items()))
+
+    def request(self, *args, **kwargs) -> Any:
+        key = self._key(args, kwargs)
+        now = monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self._ttl:
+                    self._cache.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                if age < self._ttl + self._stale_ttl:
+                    self._cache.move_to_end(key)
+                    self.stats["stale_hits"] += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        Thread(target=self._fetch, args=(key, flight, args, kwargs),
+                               daemon=True).start()
+                    return value
+
+            flight = self._flights.get(key)
+            if flight is None:
+                self.stats["misses"] += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                self.stats["coalesced"] += 1
+                leader = False
+
+        if leader:
+            self._fetch(key, flight, args, kwargs)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _fetch(self, key: Hashable, flight: _Flight, args: Tuple, kwargs: Dict[str, Any]) -> None:
+        try:
+            flight.result = self._real_subject.request(*args, **kwargs)
+        except BaseException as error:
+            # failures are handed to the waiting callers but never cached
+            flight.error = error
+        with self._lock:
+            if flight.error is None and not flight.invalidated:
+                self._cache[key] = (flight.result, monotonic())
+                self._cache.move_to_end(key)
+                while len(self._cache) > self._maxsize:
+                    self._cache.popitem(last=False)
+            del self._flights[key]
+        flight.done.set()
+
+    def invalidate(self, *args, **kwargs) -> None:
+        key = self._key(args, kwargs)
+        with self._lock:
+            self._cache.pop(key, None)
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.invalidated = True
+
+
+def benchmark_bursts(threads: int = 32, bursts: int = 10, keys: int = 8) -> None:
+    """Every burst all threads fire at once, mostly at the same few keys"""
+    options = (("no cache", None), ("ttl", {"ttl": 0.1}),
+               ("ttl + stale", {"ttl": 0.1, "stale_ttl": 1.0}))
+    for label, caching in options:
+        backend = SlowRealSubject()
+        subject = backend if caching is None else CachingProxy(backend, **caching)
+        latencies: List[List[float]] = [[] for _ in range(threads)]
+
+        def worker(index: int) -> None:
+            rng = random.Random(index)
+            own = latencies[index]
+            for _ in range(bursts):
+                started = perf_counter()
+                subject.request(min(int(rng.expovariate(0.5)), keys - 1))
+                own.append(perf_counter() - started)
+                sleep(0.05)
+
+        workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        ordered = sorted(latency for own in latencies for latency in own)
+        print(f"Benchmark: {label:11} {len(ordered)} requests, backend calls {backend.calls:4}, "
+              f"p50 {ordered[len(ordered) // 2] * 1e3:6.2f}ms, "
+              f"p99 {ordered[int(len(ordered) * 0.99)] * 1e3:6.2f}ms")
+
+
+if __name__ == "__main__":
+    backend = SlowRealSubject()
+    proxy = CachingProxy(backend, ttl=60)
+
+    callers = [Thread(target=proxy.request, args=("report",)) for _ in range(10)]
+    for thread in callers:
+        thread.start()
+    for thread in callers:
+        thread.join()
+    print(f"Client: 10 concurrent identical requests made {backend.calls} backend call")
+    print(f"Client: {proxy.request('report')}, stats: {proxy.stats}\n")
+
+    benchmark_bursts()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import gc
+import random
+import tracemalloc
+from array import array
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from structural.flyweight import Flyweight, FlyweightFactory
+
+Car = Tuple[str, str, str, str, str]
+
+
+class DictionaryColumn:
+    """Low cardinality strings: each distinct value is stored once, rows keep its code"""
+
+    def __init__(self) -> None:
+        self._codes = array("I")
+        self._values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def append(self, value: str) -> None:
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self._values)
+            self._values.append(value)
+        self._codes.append(code)
+
+    def __getitem__(self, row: int) -> str:
+        return self._values[self._codes[row]]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+class FixedWidthColumn:
+    """High cardinality short ASCII strings packed into one bytearray, `width` bytes per row"""
+
+    def __init__(self, width: int) -> None:
+        self._width = width
+        self._data = bytearray()
+
+    def append(self, value: str) -> None:
+        encoded = value.encode("ascii")
+        if len(encoded) > self._width:
+            raise ValueError(f"{value!r} is longer than {self._width} bytes")
+        self._data += encoded.ljust(self._width, b"\0")
+
+    def __getitem__(self, row: int) -> str:
+        start = row * self._width
+        return self._data[start:start + self._width].rstrip(b"\0").decode("ascii")
+
+    def __len__(self) -> int:
+        return len(self._data) // self._width
+
+
+class CarDatabase:
+    """
+    Police database keeping the extrinsic state column by column: every car
+    is a row made of a flyweight id, a packed plate and a dictionary encoded
+    owner. Rows are also indexed by flyweight, so a filter such as "all red
+    BMWs" only touches the matching flyweights and their rows.
+    """
+
+    def __init__(self, factory: FlyweightFactory, plate_width: int = 8) -> None:
+        self._factory = factory
+        self._flyweights: List[Flyweight] = []
+        self._flyweight_ids: Dict[Tuple[str, ...], int] = {}
+        self._rows_by_flyweight: List[array] = []
+        self._flyweight_column = array("I")
+        self._plates = FixedWidthColumn(plate_width)
+        self._owners = DictionaryColumn()
+
+    def __len__(self) -> int:
+        return len(self._flyweight_column)
+
+    def add_car(self, plates: str, owner: str, brand: str, model: str, color: str) -> int:
+        state = [brand, model, color]
+        key = self._factory.get_key(state)
+        flyweight_id = self._flyweight_ids.get(key)
+        if flyweight_id is None:
+            flyweight_id = self._flyweight_ids[key] = len(self._flyweights)
+            self._flyweights.append(self._factory.get_flyweight(state))
+            self._rows_by_flyweight.append(array("I"))
+
+        row = len(self._flyweight_column)
+        self._plates.append(plates)
+        self._owners.append(owner)
+        self._flyweight_column.append(flyweight_id)
+        self._rows_by_flyweight[flyweight_id].append(row)
+        return row
+
+    def add_cars(self, cars: Iterable[Car]) -> None:
+        add_car = self.add_car
+        for car in cars:
+            add_car(*car)
+
+    def car(self, row: int) -> Car:
+        brand, model, color = self._flyweights[self._flyweight_column[row]]._shared_state
+        return self._plates[row], self._owners[row], brand, model, color
+
+    def select(self, brand: Optional[str] = None, model: Optional[str] = None,
+               color: Optional[str] = None) -> Iterator[int]:
+        """Rows of the cars matching every given attribute, in insertion order"""
+        wanted = (brand, model, color)
+        matching = [
+            rows for flyweight, rows in zip(self._flyweights, self._rows_by_flyweight)
+            if all(w is None or w == v for w, v in zip(wanted, flyweight._shared_state))
+        ]
+        if len(matching) == 1:
+            return iter(matching[0])
+        return iter(sorted(row for rows in matching for row in rows))
+
+    def operation(self, row: int) -> None:
+        plates, owner = self._plates[row], self._owners[row]
+        self._flyweights[self._flyweight_column[row]].operation([plates, owner])
+
+
+class CarRecord:
+    """One object per car, the layout the columnar store replaces"""
+
+    __slots__ = ("plates", "owner", "flyweight")
+
+    def __init__(self, plates: str, owner: str, flyweight: Flyweight) -> None:
+        self.plates = plates
+        self.owner = owner
+        self.flyweight = flyweight
+
+
+def _random_cars(count: int) -> Iterator[Car]:
+    rng = random.Random(42)
+    brands = {"BMW": ["M5", "X1", "X6"], "Mercedes Benz": ["C300", "C500"],
+              "Chevrolet": ["Camaro2018"]}
+    owners = count // 10 or 1
+    colors = ["red", "white", "black", "pink"]
+    for i in range(count):
+        brand = rng.choice(list(brands))
+        yield (f"CL{i:06d}", f"Owner {rng.randrange(owners)}", brand,
+               rng.choice(brands[brand]), rng.choice(colors))
+
+
+def benchmark_memory(count: int = 1_000_000) -> None:
+    # both stores read freshly generated cars, as they would come from parsing an input
+    def objects() -> List[CarRecord]:
+        factory = FlyweightFactory([])
+        return [CarRecord(plates, owner, factory.get_flyweight([brand, model, color]))
+                for plates, owner, brand, model, color in _random_cars(count)]
+
+    def columns() -> CarDatabase:
+        database = CarDatabase(FlyweightFactory([]))
+        database.add_cars(_random_cars(count))
+        return database
+
+    for label, build in (("one object per car", objects), ("columnar store", columns)):
+        gc.collect()
+        tracemalloc.start()
+        store = build()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Benchmark: {label:18} {count} cars: {memory / 2 ** 20:7.1f}MiB, "
+              f"{memory / count:5.1f} bytes per car")
+
+        started = perf_counter()
+        if isinstance(store, CarDatabase):
+            found = sum(1 for _ in store.select(brand="BMW", color="red"))
+        else:
+            found = sum(1 for car in store if car.flyweight._shared_state[0] == "BMW"
+                        and car.flyweight._shared_state[2] == "red")
+        print(f"Benchmark: {label:18} found {found} red BMWs in "
+              f"{(perf_counter() - started) * 1e3:.1f}ms")
+        del store
+
+
+if __name__ == "__main__":
+    database = CarDatabase(FlyweightFactory([]))
+    database.add_cars([
+        ("CL234IR", "James Doe", "BMW", "M5", "red"),
+        ("CL235IR", "Jane Doe", "BMW", "X1", "red"),
+        ("CL236IR", "James Doe", "BMW", "M5", "white"),
+    ])
+    for row in database.select(brand="BMW", color="red"):
+        print(f"Red BMW: {database.car(row)}")
+    database.operation(0)
+    print("\n")
+
+    benchmark_memory()
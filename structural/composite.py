@@ -1,9 +1,18 @@
 from __future__ import annotations
+import gc
+import io
+import os
+import tracemalloc
 from abc import ABC, abstractmethod
-from typing import List
+from collections import deque
+from random import Random
+from time import perf_counter
+from typing import Iterator, List, Optional, Sequence, TextIO
 
 
 class ProductComponent(ABC):
+    _parent: Optional[ProductComponent] = None
+
     @property
     def parent(self) -> ProductComponent:
         return self._parent
@@ -41,6 +50,15 @@ class ProductComponent(ABC):
 
         return False
 
+    @property
+    def children(self) -> Sequence[ProductComponent]:
+        return ()
+
+    def invalidate(self) -> None:
+        """Tells the containers above that the result of this component changed"""
+        if self._parent is not None:
+            self._parent.invalidate()
+
     @abstractmethod
     def operation(self) -> str:
         """
@@ -77,27 +95,160 @@ class BoxComposite(ProductComponent):
     Класс Контейнер содержит сложные компоненты, которые могут иметь вложенные
     компоненты. Обычно объекты Контейнеры делегируют фактическую работу своим
     детям, а затем «суммируют» результат.
+
+    Every container keeps its last result until it or something below it
+    changes, so a repeated `operation()` recomputes only the changed path.
+    Only results of up to `cache_limit` characters are kept: a larger one
+    would copy its cached parts once more at every level above them, so it
+    is streamed from those parts instead and memory stays near the size of
+    the results themselves, at any depth.
     """
 
+    cache_limit = 4096
+
     def __init__(self) -> None:
         self._children: List[ProductComponent] = []
+        self._cache: Optional[str] = None
 
     def add(self, component: ProductComponent) -> None:
-        self._children.append(component)
+        # an ancestor of this container has children, so a new or empty one
+        # is added without walking up the tree
+        node = self if component is self or component.children else None
+        while node is not None:
+            if node is component:
+                raise ValueError("a container cannot be added below itself")
+            node = node.parent
+        # the child may refuse this parent, the tree is changed only after it agreed
         component.parent = self
+        self._children.append(component)
+        self.invalidate()
 
     def remove(self, component: ProductComponent) -> None:
         self._children.remove(component)
         component.parent = None
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        # the ancestors of a dirty container are always dirty, so the walk up
+        # stops at the first one without a cached result
+        node = self
+        while node is not None and node._cache is not None:
+            node._cache = None
+            node = node._parent
 
     def is_composite(self) -> bool:
         return True
 
+    @property
+    def children(self) -> Sequence[ProductComponent]:
+        return self._children
+
     def operation(self) -> str:
-        results = []
-        for child in self._children:
-            results.append(child.operation())
-        return f"Branch({'+'.join(results)})"
+        if self._cache is None:
+            _refresh(self)
+        if self._cache is not None:
+            return self._cache
+        buffer = io.StringIO()
+        write_operation(self, buffer)
+        return buffer.getvalue()
+
+
+def _refresh(root: BoxComposite) -> None:
+    """
+    Recomputes the dirty containers under `root` children first, without
+    recursion. A container is cached only when all its composite children
+    are and its result fits in `cache_limit`, its length is checked before
+    the string is built.
+    """
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            stack.append((node, True))
+            for child in node._children:
+                if isinstance(child, BoxComposite) and child._cache is None:
+                    stack.append((child, False))
+            continue
+
+        parts = []
+        # "Branch(", ")" and the "+" between children
+        size = 7 + max(len(node._children), 1)
+        for child in node._children:
+            part = getattr(child, "_cache", None) if child.is_composite() else child.operation()
+            if part is None:
+                break
+            size += len(part)
+            if size > node.cache_limit:
+                break
+            parts.append(part)
+        else:
+            node._cache = f"Branch({'+'.join(parts)})"
+
+
+def iter_pre_order(root: ProductComponent) -> Iterator[ProductComponent]:
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def iter_post_order(root: ProductComponent) -> Iterator[ProductComponent]:
+    stack = [(root, iter(root.children))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield node
+        else:
+            stack.append((child, iter(child.children)))
+
+
+def iter_breadth_first(root: ProductComponent) -> Iterator[ProductComponent]:
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(node.children)
+
+
+def write_operation(component: ProductComponent, out: TextIO, chunk_size: int = 8192) -> None:
+    """
+    Writes what `component.operation()` returns piece by piece, walking the
+    tree with an explicit stack: depth is not limited by the recursion limit
+    and no intermediate string is built for any branch.
+    """
+    pieces: List[str] = []
+    stack = [iter((component,))]
+    first = [True]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            first.pop()
+            if stack:
+                pieces.append(")")
+            continue
+
+        if first[-1]:
+            first[-1] = False
+        else:
+            pieces.append("+")
+        cached = getattr(child, "_cache", None) if child.is_composite() else None
+        if cached is not None:
+            pieces.append(cached)
+        elif child.is_composite():
+            pieces.append("Branch(")
+            stack.append(iter(child.children))
+            first.append(True)
+        else:
+            pieces.append(child.operation())
+
+        if len(pieces) >= chunk_size:
+            out.write("".join(pieces))
+            pieces.clear()
+    out.write("".join(pieces))
 
 
 def client_code(component: ProductComponent) -> None:
@@ -115,6 +266,107 @@ def client_code2(component1: ProductComponent, component2: ProductComponent) ->
     print(f"RESULT: {component1.operation()}", end="")
 
 
+def _recursive_operation(component: ProductComponent) -> str:
+    """The former recursive BoxComposite.operation, kept as the benchmark baseline"""
+    if not component.is_composite():
+        return component.operation()
+    return f"Branch({'+'.join(_recursive_operation(child) for child in component.children)})"
+
+
+def benchmark_traversal(nodes: int = 1_000_000, depth: int = 100_000) -> None:
+    wide = BoxComposite()
+    for _ in range(nodes // 1000):
+        box = BoxComposite()
+        for _ in range(999):
+            box.add(AirTag())
+        wide.add(box)
+
+    deep = BoxComposite()
+    box = deep
+    for _ in range(depth):
+        inner = BoxComposite()
+        box.add(IPhone())
+        box.add(inner)
+        box = inner
+
+    for label, tree in (("wide tree, 10^6 nodes", wide), (f"deep tree, depth {depth}", deep)):
+        for name, walk in (("pre-order", iter_pre_order), ("post-order", iter_post_order),
+                           ("breadth-first", iter_breadth_first)):
+            started = perf_counter()
+            count = sum(1 for _ in walk(tree))
+            print(f"Benchmark: {label:24} {name:13} {count} nodes in "
+                  f"{perf_counter() - started:.2f}s")
+
+        with open(os.devnull, "w") as out:
+            started = perf_counter()
+            write_operation(tree, out)
+            print(f"Benchmark: {label:24} streamed operation in {perf_counter() - started:.2f}s")
+        started = perf_counter()
+        try:
+            _recursive_operation(tree)
+            print(f"Benchmark: {label:24} recursive operation in {perf_counter() - started:.2f}s")
+        except RecursionError:
+            print(f"Benchmark: {label:24} recursive operation fails with RecursionError")
+
+
+def benchmark_invalidation(fanout: int = 100, changes: int = 20, depth: int = 8000) -> None:
+    """
+    Evaluates a three level tree of `fanout` ** 3 leaves after each random
+    single leaf change, memoized and recomputed from scratch, then measures
+    what a chain of `depth` containers keeps cached.
+    """
+    leaf_classes = (IPhone, MacBook, AirPods, AirTag)
+    root = BoxComposite()
+    boxes = []
+    for _ in range(fanout):
+        middle = BoxComposite()
+        for _ in range(fanout):
+            box = BoxComposite()
+            for i in range(fanout):
+                box.add(leaf_classes[i % 4]())
+            middle.add(box)
+            boxes.append(box)
+        root.add(middle)
+
+    started = perf_counter()
+    root.operation()
+    print(f"Benchmark: first evaluation of {fanout ** 3} leaves in {perf_counter() - started:.2f}s")
+
+    random = Random(0)
+    timings = {"memoized": 0.0, "full recomputation": 0.0}
+    for _ in range(changes):
+        box = random.choice(boxes)
+        box.remove(random.choice(box.children))
+        box.add(random.choice(leaf_classes)())
+
+        started = perf_counter()
+        memoized = root.operation()
+        timings["memoized"] += perf_counter() - started
+        started = perf_counter()
+        full = _recursive_operation(root)
+        timings["full recomputation"] += perf_counter() - started
+        assert memoized == full, "memoized result differs from the recomputed one"
+
+    for label, elapsed in timings.items():
+        print(f"Benchmark: {label:18} {elapsed / changes * 1e3:9.2f}ms per evaluation "
+              f"after a single leaf change")
+
+    deep = BoxComposite()
+    box = deep
+    for _ in range(depth):
+        inner = BoxComposite()
+        box.add(IPhone())
+        box.add(inner)
+        box = inner
+    gc.collect()
+    tracemalloc.start()
+    result = deep.operation()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Benchmark: deep tree, depth {depth}: {len(result) / 2 ** 10:.0f}KiB result, "
+          f"{retained / 2 ** 20:.1f}MiB retained with the result and the caches")
+
+
 if __name__ == "__main__":
     simple = IPhone()
     print("Client: I've got a simple component:")
@@ -139,3 +391,11 @@ if __name__ == "__main__":
 
     print("Client: I don't need to check the components classes even when managing the tree:")
     client_code2(tree, simple)
+    print("\n")
+
+    print("Client: The same tree visited node by node, in pre-order:")
+    print(", ".join(type(node).__name__ for node in iter_pre_order(tree)))
+    print("")
+
+    benchmark_traversal()
+    benchmark_invalidation()
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import gc
+import io
+import tracemalloc
+from array import array
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO
+
+from structural.composite import (AirPods, AirTag, BoxComposite, IPhone, MacBook,
+                                  ProductComponent, iter_pre_order)
+
+NO_NODE = -1
+
+
+class ArenaTree:
+    """
+    Keeps a forest of products in flat arrays indexed by node id: parent,
+    first and last child, next and previous sibling, and an interned type
+    code. Siblings form a doubly linked list, so a node is added or removed
+    in O(1), and a whole catalog is loaded with a single `extend()`.
+
+    Leaf classes are stateless, the result of their `operation()` is
+    interned once per class. A removed node keeps its slot and can be added
+    back, under the same or another parent.
+    """
+
+    def __init__(self) -> None:
+        self._parent = array("i")
+        self._first_child = array("i")
+        self._last_child = array("i")
+        self._next_sibling = array("i")
+        self._prev_sibling = array("i")
+        self._codes = array("B")
+        self._types: List[type] = []
+        self._labels: List[Optional[str]] = []
+        self._type_codes: Dict[type, int] = {}
+        self.BOX = self.intern(BoxComposite)
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def intern(self, kind: type) -> int:
+        code = self._type_codes.get(kind)
+        if code is None:
+            if len(self._types) == 256:
+                raise ValueError("an arena holds at most 256 product types")
+            code = self._type_codes[kind] = len(self._types)
+            self._types.append(kind)
+            self._labels.append(None if issubclass(kind, BoxComposite) else kind().operation())
+        return code
+
+    def new_node(self, kind: type, parent: int = NO_NODE) -> int:
+        self.extend((parent,), (self.intern(kind),))
+        return len(self._parent) - 1
+
+    def extend(self, parents: Iterable[int], codes: Iterable[int]) -> range:
+        """
+        Bulk loads nodes of the given type codes: every parent is either
+        NO_NODE, an existing node or a node loaded earlier in the same call.
+        Returns the ids of the new nodes.
+        """
+        base = len(self._parent)
+        self._parent.extend(parents)
+        self._codes.extend(codes)
+        count = len(self._parent) - base
+        try:
+            if len(self._codes) != base + count:
+                raise ValueError("parents and codes differ in length")
+            if any(code >= len(self._types) for code in self._codes[base:]):
+                raise ValueError("unknown type code, intern the type first")
+            for node, owner in enumerate(self._parent[base:], base):
+                if not NO_NODE <= owner < node:
+                    raise ValueError(f"node {node} is loaded before its parent {owner}")
+        except ValueError:
+            del self._parent[base:]
+            del self._codes[base:]
+            raise
+
+        empty = array("i", [NO_NODE]) * count
+        for links in (self._first_child, self._last_child, self._next_sibling, self._prev_sibling):
+            links.extend(empty)
+
+        parent, first, last = self._parent, self._first_child, self._last_child
+        next_sibling, prev_sibling = self._next_sibling, self._prev_sibling
+        for node in range(base, base + count):
+            owner = parent[node]
+            if owner == NO_NODE:
+                continue
+            previous = last[owner]
+            if previous == NO_NODE:
+                first[owner] = node
+            else:
+                next_sibling[previous] = node
+                prev_sibling[node] = previous
+            last[owner] = node
+        return range(base, base + count)
+
+    def add(self, parent: int, node: int) -> None:
+        if self._labels[self._codes[parent]] is not None:
+            raise ValueError(f"node {parent} is not a composite")
+        ancestor = parent
+        while ancestor != NO_NODE:
+            if ancestor == node:
+                raise ValueError(f"node {node} cannot be added below itself")
+            ancestor = self._parent[ancestor]
+        if self._parent[node] != NO_NODE:
+            self.remove(node)
+        previous = self._last_child[parent]
+        if previous == NO_NODE:
+            self._first_child[parent] = node
+        else:
+            self._next_sibling[previous] = node
+        self._prev_sibling[node] = previous
+        self._last_child[parent] = node
+        self._parent[node] = parent
+
+    def remove(self, node: int) -> None:
+        parent = self._parent[node]
+        if parent == NO_NODE:
+            return
+        previous, following = self._prev_sibling[node], self._next_sibling[node]
+        if previous == NO_NODE:
+            self._first_child[parent] = following
+        else:
+            self._next_sibling[previous] = following
+        if following == NO_NODE:
+            self._last_child[parent] = previous
+        else:
+            self._prev_sibling[following] = previous
+        self._parent[node] = self._prev_sibling[node] = self._next_sibling[node] = NO_NODE
+
+    def parent(self, node: int) -> int:
+        return self._parent[node]
+
+    def children(self, node: int) -> List[int]:
+        children = []
+        child = self._first_child[node]
+        while child != NO_NODE:
+            children.append(child)
+            child = self._next_sibling[child]
+        return children
+
+    def kind(self, node: int) -> type:
+        return self._types[self._codes[node]]
+
+    def is_composite(self, node: int) -> bool:
+        return self._labels[self._codes[node]] is None
+
+    def component(self, node: int) -> ArenaComponent:
+        return ArenaComponent(self, node)
+
+    def load(self, component: ProductComponent, parent: int = NO_NODE) -> int:
+        """Copies an object tree into the arena, returns the id of its root"""
+        index: Dict[int, int] = {}
+        parents = []
+        codes = []
+        base = len(self._parent)
+        for node in iter_pre_order(component):
+            index[id(node)] = base + len(parents)
+            parents.append(index[id(node.parent)] if node is not component else parent)
+            codes.append(self.intern(type(node)))
+        return self.extend(parents, codes)[0]
+
+    def write_operation(self, node: int, out: TextIO, chunk_size: int = 8192) -> None:
+        """
+        Writes what the `operation()` of `node` returns, following the
+        sibling and parent links, so no stack is needed at any depth.
+        """
+        labels, codes = self._labels, self._codes
+        parent, first, next_sibling = self._parent, self._first_child, self._next_sibling
+        pieces: List[str] = []
+        current = node
+        while True:
+            label = labels[codes[current]]
+            if label is not None:
+                pieces.append(label)
+            else:
+                pieces.append("Branch(")
+                child = first[current]
+                if child != NO_NODE:
+                    current = child
+                    continue
+                pieces.append(")")
+
+            while current != node and next_sibling[current] == NO_NODE:
+                current = parent[current]
+                pieces.append(")")
+            if current == node:
+                break
+            pieces.append("+")
+            current = next_sibling[current]
+
+            if len(pieces) >= chunk_size:
+                out.write("".join(pieces))
+                pieces.clear()
+        out.write("".join(pieces))
+
+    def operation(self, node: int) -> str:
+        buffer = io.StringIO()
+        self.write_operation(node, buffer)
+        return buffer.getvalue()
+
+
+class ArenaComponent(ProductComponent):
+    """
+    A ProductComponent view of one arena node, created on demand, so client
+    code written against the object tree works on the arena unchanged.
+    """
+
+    def __init__(self, tree: ArenaTree, node: int) -> None:
+        self._tree = tree
+        self._node = node
+
+    @property
+    def node(self) -> int:
+        return self._node
+
+    @property
+    def parent(self) -> Optional[ArenaComponent]:
+        parent = self._tree.parent(self._node)
+        return None if parent == NO_NODE else ArenaComponent(self._tree, parent)
+
+    @parent.setter
+    def parent(self, parent: Optional[ArenaComponent]) -> None:
+        if parent is None:
+            self._tree.remove(self._node)
+        elif not isinstance(parent, ArenaComponent):
+            raise TypeError("an arena node can only be added to a node of its own arena, "
+                            "copy object trees into the arena with ArenaTree.load()")
+        else:
+            self._tree.add(self._own(parent)._node, self._node)
+
+    def _own(self, component: ProductComponent) -> ArenaComponent:
+        if isinstance(component, ArenaComponent):
+            if component._tree is not self._tree:
+                raise ValueError("the component belongs to another arena")
+            return component
+        return ArenaComponent(self._tree, self._tree.load(component))
+
+    def add(self, component: ProductComponent) -> None:
+        """Arena components are linked, any other component is copied into the arena"""
+        self._tree.add(self._node, self._own(component)._node)
+
+    def remove(self, component: ProductComponent) -> None:
+        if not isinstance(component, ArenaComponent) or component._tree is not self._tree \
+                or self._tree.parent(component._node) != self._node:
+            raise ValueError("the component is not a child of this node")
+        self._tree.remove(component._node)
+
+    def is_composite(self) -> bool:
+        return self._tree.is_composite(self._node)
+
+    @property
+    def children(self) -> Sequence[ArenaComponent]:
+        tree = self._tree
+        return [ArenaComponent(tree, child) for child in tree.children(self._node)]
+
+    def operation(self) -> str:
+        return self._tree.operation(self._node)
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, ArenaComponent) and other._tree is self._tree
+                and other._node == self._node)
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self._node))
+
+    def __repr__(self) -> str:
+        return f"<{self._tree.kind(self._node).__name__} node {self._node}>"
+
+
+def benchmark_catalog(nodes: int = 10_000_000, fanout: int = 1000) -> None:
+    """
+    Builds the same catalog, a root with boxes of `fanout` - 1 products each,
+    as an object tree and as an arena, timing first and measuring memory
+    after all timings are taken.
+    """
+    leaf_classes = (IPhone, MacBook, AirPods, AirTag)
+    boxes = nodes // fanout
+
+    def objects() -> BoxComposite:
+        root = BoxComposite()
+        for _ in range(boxes):
+            box = BoxComposite()
+            for i in range(fanout - 1):
+                box.add(leaf_classes[i % 4]())
+            root.add(box)
+        return root
+
+    def arena() -> ArenaTree:
+        tree = ArenaTree()
+        root = tree.new_node(BoxComposite)
+        leaf_codes = [tree.intern(kind) for kind in leaf_classes]
+        box_codes = array("B", [tree.BOX])
+        leaf_block = array("B", (leaf_codes[i % 4] for i in range(fanout - 1)))
+
+        def parents():
+            # a box follows the products of the previous one
+            for box in range(root + 1, root + 1 + boxes * fanout, fanout):
+                yield root
+                for _ in range(fanout - 1):
+                    yield box
+
+        codes = (box_codes + leaf_block) * boxes
+        tree.extend(parents(), codes)
+        return tree
+
+    builds = (("object tree", objects), ("arena", arena))
+    timings = {}
+    for label, build in builds:
+        gc.collect()
+        started = perf_counter()
+        store = build()
+        timings[label] = perf_counter() - started
+        del store
+
+    for label, build in builds:
+        gc.collect()
+        tracemalloc.start()
+        store = build()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = len(store) if isinstance(store, ArenaTree) else boxes * fanout + 1
+        del store
+        print(f"Benchmark: {label:11} {count} nodes built in {timings[label]:5.2f}s, "
+              f"{memory / 2 ** 20:7.1f}MiB, {memory / count:5.1f} bytes per node")
+
+
+if __name__ == "__main__":
+    tree = BoxComposite()
+    branch1 = BoxComposite()
+    branch1.add(MacBook())
+    branch1.add(AirPods())
+    branch2 = BoxComposite()
+    branch2.add(AirTag())
+    tree.add(branch1)
+    tree.add(branch2)
+
+    arena = ArenaTree()
+    root = arena.component(arena.load(tree))
+    print(f"Object tree: {tree.operation()}")
+    print(f"Arena:       {root.operation()}")
+
+    first, second = root.children
+    root.remove(first)
+    second.add(IPhone())
+    print(f"Arena, first branch removed and an IPhone added to the second: {root.operation()}")
+    print(f"Nodes in pre-order: {list(iter_pre_order(root))}\n")
+
+    benchmark_catalog()
@@ -1,3 +1,7 @@
+from timeit import Timer
+from typing import Callable, List, Tuple, Union
+
+
 class BaseNotifier:
     """
     Базовый интерфейс Компонента определяет поведение, которое изменяется
@@ -29,6 +33,10 @@ class Decorator(BaseNotifier):
 
     _component: BaseNotifier = None
 
+    # text put around the wrapped result, decorators doing more override decorate()
+    prefix: str = ""
+    suffix: str = ""
+
     def __init__(self, component: BaseNotifier) -> None:
         self._component = component
 
@@ -36,8 +44,17 @@ class Decorator(BaseNotifier):
     def component(self) -> BaseNotifier:
         return self._component
 
+    def decorate(self, result: str) -> str:
+        return f"{self.prefix}{result}{self.suffix}"
+
     def operation(self) -> str:
-        return self._component.operation()
+        """
+        Декораторы могут вызывать родительскую реализацию операции, вместо того,
+        чтобы вызвать обёрнутый объект напрямую. Такой подход упрощает
+        расширение классов декораторов: конкретным декораторам достаточно
+        задать prefix/suffix или переопределить decorate().
+        """
+        return self.decorate(self._component.operation())
 
 
 class SMSDecorator(Decorator):
@@ -46,13 +63,8 @@ class SMSDecorator(Decorator):
     некоторым образом.
     """
 
-    def operation(self) -> str:
-        """
-        Декораторы могут вызывать родительскую реализацию операции, вместо того,
-        чтобы вызвать обёрнутый объект напрямую. Такой подход упрощает
-        расширение классов декораторов.
-        """
-        return f"SMSDecorator({self.component.operation()})"
+    prefix = "SMSDecorator("
+    suffix = ")"
 
 
 class FacebookDecorator(Decorator):
@@ -61,8 +73,59 @@ class FacebookDecorator(Decorator):
     объекта.
     """
 
+    prefix = "FacebookDecorator("
+    suffix = ")"
+
+
+class FrozenNotifier(BaseNotifier):
+    """
+    A decorator chain flattened into one pipeline that runs in a loop: no
+    recursion, so any depth works, and runs of prefix/suffix decorators are
+    merged into a single pair of strings. It is a snapshot, changes made to
+    the chain after freezing are not seen.
+    """
+
+    def __init__(self, core: BaseNotifier,
+                 steps: List[Union[Tuple[str, str], Callable[[str], str]]]) -> None:
+        self._core = core
+        self._steps = steps
+
     def operation(self) -> str:
-        return f"FacebookDecorator({self.component.operation()})"
+        result = self._core.operation()
+        for step in self._steps:
+            if type(step) is tuple:
+                result = f"{step[0]}{result}{step[1]}"
+            else:
+                result = step(result)
+        return result
+
+
+def freeze(component: BaseNotifier) -> FrozenNotifier:
+    layers = []
+    while isinstance(component, Decorator):
+        layers.append(component)
+        component = component._component
+
+    steps = []
+    prefixes: List[str] = []
+    suffixes: List[str] = []
+    # innermost decorator is applied first
+    for layer in reversed(layers):
+        layer_class = type(layer)
+        if layer_class.operation is not Decorator.operation:
+            raise TypeError(f"{layer_class.__name__} overrides operation(), "
+                            f"implement decorate() instead to make it freezable")
+        if layer_class.decorate is Decorator.decorate:
+            prefixes.append(layer.prefix)
+            suffixes.append(layer.suffix)
+            continue
+        if prefixes:
+            steps.append(("".join(reversed(prefixes)), "".join(suffixes)))
+            prefixes, suffixes = [], []
+        steps.append(layer.decorate)
+    if prefixes:
+        steps.append(("".join(reversed(prefixes)), "".join(suffixes)))
+    return FrozenNotifier(component, steps)
 
 
 def client_code(component: BaseNotifier) -> None:
@@ -75,6 +138,24 @@ def client_code(component: BaseNotifier) -> None:
     print(f"RESULT: {component.operation()}")
 
 
+def benchmark_depth(depths: Tuple[int, ...] = (1, 10, 100, 1_000, 10_000)) -> None:
+    for depth in depths:
+        component = Notifier()
+        for level in range(depth):
+            component = (SMSDecorator if level % 2 else FacebookDecorator)(component)
+        frozen = freeze(component)
+
+        timings = []
+        for label, notifier in (("nested", component), ("frozen", frozen)):
+            timer = Timer(notifier.operation)
+            try:
+                number, elapsed = timer.autorange()
+                timings.append(f"{label} {elapsed / number * 1e6:10.2f}us")
+            except RecursionError:
+                timings.append(f"{label} {'RecursionError':>12}")
+        print(f"Benchmark: depth {depth:6}: {', '.join(timings)}")
+
+
 if __name__ == "__main__":
     simple = Notifier()
     print("Client: I've got a simple notifier:")
@@ -85,3 +166,9 @@ if __name__ == "__main__":
     print("Client: Now I've got a decorated notifier:")
     client_code(decorator1)
     client_code(decorator2)
+
+    print("Client: The same notifier frozen into a flat pipeline:")
+    client_code(freeze(decorator2))
+    print("")
+
+    benchmark_depth()
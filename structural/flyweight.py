@@ -1,42 +1,153 @@
+import io
 import json
-from typing import Dict
+import random
+import weakref
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+_encode = json.JSONEncoder().encode
 
 
 class Flyweight():
     def __init__(self, shared_state: str) -> None:
         self._shared_state = shared_state
+        # the shared state never changes, so it is encoded once per flyweight
+        self._prefix = f"Flyweight: Displaying shared ({_encode(shared_state)}) and unique ("
+
+    def render(self, unique_state: str) -> str:
+        return f"{self._prefix}{_encode(unique_state)}) state."
 
     def operation(self, unique_state: str) -> None:
-        s = json.dumps(self._shared_state)
-        u = json.dumps(unique_state)
-        print(f"Flyweight: Displaying shared ({s}) and unique ({u}) state.", end="")
+        print(self.render(unique_state), end="")
+
+
+def render_many(records: Iterable[Tuple[Flyweight, Any]], out: TextIO,
+                chunk_size: int = 4096) -> int:
+    """
+    Writes one line per (flyweight, unique state) record to `out`, records
+    are joined into chunks so the buffer is written once per `chunk_size`.
+    """
+    encode = _encode
+    chunk: List[str] = []
+    count = 0
+    for flyweight, unique_state in records:
+        chunk.append(f"{flyweight._prefix}{encode(unique_state)}) state.\n")
+        if len(chunk) == chunk_size:
+            out.write("".join(chunk))
+            count += chunk_size
+            chunk.clear()
+    out.write("".join(chunk))
+    return count + len(chunk)
+
+
+class _Stripe:
+    def __init__(self, weak: bool, maxsize: Optional[int]) -> None:
+        self.lock = Lock()
+        self.flyweights = weakref.WeakValueDictionary() if weak else OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
 
 class FlyweightFactory():
-    _flyweights: Dict[str, Flyweight] = {}
+    """
+    Every factory owns its flyweights. They are spread over `stripes`
+    independently locked parts by key hash, so threads looking up different
+    keys rarely wait for each other. With `weak=True` a flyweight lives only
+    while something uses it (the initial ones are always kept). With
+    `maxsize` the bound is split exactly between the stripes, at most
+    `maxsize` of them, and every stripe evicts its least recently used
+    flyweights once it holds more than its share, so the factory never
+    holds more than `maxsize` flyweights.
+    """
+
+    def __init__(self, initial_flyweights: Sequence, stripes: int = 16,
+                 maxsize: Optional[int] = None, weak: bool = False,
+                 verbose: bool = False) -> None:
+        if stripes < 1:
+            raise ValueError("a factory needs at least one stripe")
+        if maxsize is None:
+            self._stripes = [_Stripe(weak, None) for _ in range(stripes)]
+        elif weak:
+            raise ValueError("choose either weak references or a maxsize bound")
+        elif maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        else:
+            stripes = min(stripes, maxsize)
+            self._stripes = [_Stripe(weak, maxsize // stripes + (i < maxsize % stripes))
+                             for i in range(stripes)]
+        self._bounded = maxsize is not None
+        self._verbose = verbose
+        self._pinned: List[Flyweight] = []
 
-    def __init__(self, initial_flyweights: Dict) -> None:
         for state in initial_flyweights:
-            self._flyweights[self.get_key(state)] = Flyweight(state)
-
-    def get_key(self, state: Dict) -> str:
-        return "_".join(sorted(state))
-
-    def get_flyweight(self, shared_state: Dict) -> Flyweight:
+            key = self.get_key(state)
+            stripe = self._stripe(key)
+            flyweight = Flyweight(state)
+            with stripe.lock:
+                self._insert(stripe, key, flyweight)
+            if weak:
+                self._pinned.append(flyweight)
+
+    def get_key(self, state: Sequence[str]) -> Tuple[str, ...]:
+        return tuple(sorted(state))
+
+    def get_flyweight(self, shared_state: Sequence[str]) -> Flyweight:
         key = self.get_key(shared_state)
-
-        if not self._flyweights.get(key):
-            print("FlyweightFactory: Can't find a flyweight, creating new one.")
-            self._flyweights[key] = Flyweight(shared_state)
-        else:
-            print("FlyweightFactory: Reusing existing flyweight.")
-
-        return self._flyweights[key]
+        stripe = self._stripe(key)
+        created = False
+
+        with stripe.lock:
+            flyweights = stripe.flyweights
+            flyweight = flyweights.get(key)
+            if flyweight is not None:
+                stripe.hits += 1
+                if self._bounded:
+                    flyweights.move_to_end(key)
+            else:
+                stripe.misses += 1
+                created = True
+                flyweight = Flyweight(shared_state)
+                self._insert(stripe, key, flyweight)
+
+        if self._verbose:
+            print("FlyweightFactory: Can't find a flyweight, creating new one." if created
+                  else "FlyweightFactory: Reusing existing flyweight.")
+        return flyweight
+
+    def _stripe(self, key: Tuple[str, ...]) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _insert(self, stripe: _Stripe, key: Tuple[str, ...], flyweight: Flyweight) -> None:
+        """Adds a flyweight under the stripe lock, evicting down to the stripe share of `maxsize`"""
+        flyweights = stripe.flyweights
+        flyweights[key] = flyweight
+        if stripe.maxsize is not None:
+            while len(flyweights) > stripe.maxsize:
+                flyweights.popitem(last=False)
+                stripe.evictions += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": sum(stripe.hits for stripe in self._stripes),
+            "misses": sum(stripe.misses for stripe in self._stripes),
+            "evictions": sum(stripe.evictions for stripe in self._stripes),
+        }
+
+    def __len__(self) -> int:
+        return sum(len(stripe.flyweights) for stripe in self._stripes)
 
     def list_flyweights(self) -> None:
-        count = len(self._flyweights)
+        count = len(self)
         print(f"FlyweightFactory: I have {count} flyweights:")
-        print("\n".join(map(str, self._flyweights.keys())), end="")
+        # stripes are picked by a randomized hash, sorting keeps the listing stable
+        keys = sorted(key for stripe in self._stripes for key in list(stripe.flyweights.keys()))
+        print("\n".join("_".join(key) for key in keys), end="")
 
 
 def add_car_to_police_database(
@@ -48,6 +159,61 @@ def add_car_to_police_database(
     flyweight.operation([plates, owner])
 
 
+def benchmark_lookups(threads: int = 8, lookups: int = 50_000) -> None:
+    brands = ["BMW", "Audi", "Mercedes Benz", "Chevrolet", "Toyota"]
+    models = [f"M{i}" for i in range(40)]
+    colors = ["red", "white", "black", "pink", "blue"]
+    states = [[b, m, c] for b in brands for m in models for c in colors]
+
+    for label, options in (("1 stripe", {"stripes": 1}), ("16 stripes", {}),
+                           ("16 stripes, maxsize=500", {"maxsize": 500}),
+                           ("16 stripes, weak", {"weak": True})):
+        factory = FlyweightFactory([], **options)
+        samples = [random.Random(i).choices(states, k=lookups) for i in range(threads)]
+
+        def worker(sample: List[List[str]]) -> None:
+            # cars in the database keep their flyweights alive
+            cars = []
+            get_flyweight = factory.get_flyweight
+            for state in sample:
+                cars.append(get_flyweight(state))
+
+        workers = [Thread(target=worker, args=(sample,)) for sample in samples]
+        started = perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = perf_counter() - started
+        print(f"Benchmark: {label:24} {threads * lookups / elapsed:10,.0f} lookups/s "
+              f"from {threads} threads, {factory.stats}")
+
+
+def benchmark_rendering(count: int = 1_000_000) -> None:
+    factory = FlyweightFactory([["BMW", "M5", "red"], ["BMW", "X6", "white"], ["Audi", "A4", "black"]])
+    flyweights = [factory.get_flyweight(state) for state in
+                  (["BMW", "M5", "red"], ["BMW", "X6", "white"], ["Audi", "A4", "black"])]
+    records = [(flyweights[i % 3], [f"CL{i:06d}", f"Owner {i % 1000}"]) for i in range(count)]
+
+    def per_record_print(out: TextIO) -> None:
+        with redirect_stdout(out):
+            for flyweight, unique_state in records:
+                s = json.dumps(flyweight._shared_state)
+                u = json.dumps(unique_state)
+                print(f"Flyweight: Displaying shared ({s}) and unique ({u}) state.")
+
+    def bulk(out: TextIO) -> None:
+        render_many(records, out)
+
+    for label, render in (("print per record", per_record_print), ("render_many", bulk)):
+        out = io.StringIO()
+        started = perf_counter()
+        render(out)
+        elapsed = perf_counter() - started
+        print(f"Benchmark: {label:16} {count / elapsed:12,.0f} records/s, "
+              f"{out.tell() / 2 ** 20:.1f}MiB written")
+
+
 if __name__ == "__main__":
     factory = FlyweightFactory([
         ["Chevrolet", "Camaro2018", "pink"],
@@ -55,7 +221,7 @@ if __name__ == "__main__":
         ["Mercedes Benz", "C500", "red"],
         ["BMW", "M5", "red"],
         ["BMW", "X6", "white"],
-    ])
+    ], verbose=True)
 
     factory.list_flyweights()
 
@@ -68,3 +234,7 @@ if __name__ == "__main__":
     print("\n")
 
     factory.list_flyweights()
+
+    print("\n")
+    benchmark_lookups()
+    benchmark_rendering()
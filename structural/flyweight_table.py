@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+from hashlib import blake2b
+from time import perf_counter
+from typing import Dict, Iterable, Optional, Sequence
+
+from structural.flyweight import Flyweight, FlyweightFactory
+
+# file layout: header, open addressing slot table, records
+#   header  magic, version, record count, slot count
+#   slot    64 bit key hash, record offset (0 marks an empty slot)
+#   record  key length, value length, utf-8 key, json encoded shared state
+_HEADER = struct.Struct("<4sIQQ")
+_SLOT = struct.Struct("<QQ")
+_RECORD = struct.Struct("<HI")
+_MAGIC = b"FLYW"
+_VERSION = 1
+
+
+def _encode_key(key: Sequence[str]) -> bytes:
+    return "\x1f".join(key).encode("utf-8")
+
+
+def _hash(key: bytes) -> int:
+    # the built-in hash is randomized per process, the table is shared between them
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+def write_flyweight_table(path: str, states: Iterable[Sequence[str]]) -> int:
+    """Writes the shared states to `path`, the file is replaced atomically"""
+    records: Dict[bytes, bytes] = {}
+    for state in states:
+        # same key as FlyweightFactory.get_key: state order does not matter
+        records.setdefault(_encode_key(sorted(state)), json.dumps(list(state)).encode())
+
+    slots = 1
+    while slots < 2 * len(records):
+        slots *= 2
+    table = [(0, 0)] * slots
+    body = bytearray()
+    records_start = _HEADER.size + slots * _SLOT.size
+
+    for key, value in records.items():
+        key_hash = _hash(key)
+        index = key_hash & (slots - 1)
+        while table[index][1]:
+            index = (index + 1) & (slots - 1)
+        table[index] = (key_hash, records_start + len(body))
+        body += _RECORD.pack(len(key), len(value)) + key + value
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, len(records), slots))
+            file.write(b"".join(_SLOT.pack(*slot) for slot in table))
+            file.write(body)
+        except BaseException:
+            file.close()
+            os.unlink(file.name)
+            raise
+    try:
+        os.replace(file.name, path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+    return len(records)
+
+
+class MappedFlyweightTable:
+    """
+    Read-only flyweight table mapped from a file written by
+    `write_flyweight_table`. The pages are shared by every process through
+    the OS page cache, a lookup reads only the probed slots and one record,
+    and only flyweights actually used are materialized in the process.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._slots = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a flyweight table of version {_VERSION}")
+        self._flyweights: Dict[bytes, Flyweight] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_key(self, state: Sequence[str]) -> bytes:
+        return _encode_key(sorted(state))
+
+    def get_flyweight(self, shared_state: Sequence[str]) -> Optional[Flyweight]:
+        key = self.get_key(shared_state)
+        flyweight = self._flyweights.get(key)
+        if flyweight is None:
+            value = self._find(key)
+            if value is None:
+                return None
+            flyweight = self._flyweights[key] = Flyweight(json.loads(value))
+        return flyweight
+
+    def _find(self, key: bytes) -> Optional[bytes]:
+        table, mask = self._map, self._slots - 1
+        key_hash = _hash(key)
+        index = key_hash & mask
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(table, _HEADER.size + index * _SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == key_hash:
+                key_length, value_length = _RECORD.unpack_from(table, offset)
+                start = offset + _RECORD.size
+                if table[start:start + key_length] == key:
+                    start += key_length
+                    return table[start:start + value_length]
+            index = (index + 1) & mask
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def _memory_usage() -> Dict[str, int]:
+    """Resident and proportional set size in KiB, PSS splits shared pages between processes"""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss"):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _rebuilding_worker(path: str, lookups, results) -> None:
+    started = perf_counter()
+    with open(path) as file:
+        factory = FlyweightFactory(json.load(file))
+    ready = perf_counter() - started
+    for state in lookups:
+        factory.get_flyweight(state)
+    results.put((ready, _memory_usage()))
+
+
+def _mapped_worker(path: str, lookups, results) -> None:
+    started = perf_counter()
+    table = MappedFlyweightTable(path)
+    ready = perf_counter() - started
+    for state in lookups:
+        table.get_flyweight(state)
+    results.put((ready, _memory_usage()))
+
+
+def benchmark_workers(processes: int = 8, flyweights: int = 200_000) -> None:
+    states = [[f"Brand{i % 100}", f"Model{i}", ["red", "white", "black"][i % 3]]
+              for i in range(flyweights)]
+    lookups = states[::flyweights // 1000]
+    context = multiprocessing.get_context("fork")
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "flyweights.json")
+        table_path = os.path.join(directory, "flyweights.table")
+        with open(json_path, "w") as file:
+            json.dump(states, file)
+        write_flyweight_table(table_path, states)
+        del states
+
+        for label, target, path in (("rebuild", _rebuilding_worker, json_path),
+                                    ("mmap", _mapped_worker, table_path)):
+            results = context.Queue()
+            workers = [context.Process(target=target, args=(path, lookups, results))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            reports = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            ready = sum(report[0] for report in reports) / processes
+            rss = sum(report[1].get("Rss", 0) for report in reports) / 1024
+            pss = sum(report[1].get("Pss", 0) for report in reports) / 1024
+            print(f"Benchmark: {label:7} {processes} workers, {flyweights} flyweights: "
+                  f"mean startup {ready * 1e3:8.2f}ms, total RSS {rss:6.0f}MiB, "
+                  f"total PSS {pss:6.0f}MiB")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flyweights.table")
+        write_flyweight_table(path, [
+            ["Chevrolet", "Camaro2018", "pink"],
+            ["Mercedes Benz", "C300", "black"],
+            ["Mercedes Benz", "C500", "red"],
+            ["BMW", "M5", "red"],
+            ["BMW", "X6", "white"],
+        ])
+        table = MappedFlyweightTable(path)
+        print(f"MappedFlyweightTable: I have {len(table)} flyweights.")
+        table.get_flyweight(["BMW", "M5", "red"]).operation(["CL234IR", "James Doe"])
+        print(f"\nMappedFlyweightTable: BMW X1 is in the table: "
+              f"{table.get_flyweight(['BMW', 'X1', 'red']) is not None}\n")
+        table.close()
+
+    benchmark_workers()
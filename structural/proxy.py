@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Callable, Optional
 
 
 class Subject(ABC):
@@ -12,6 +15,11 @@ class RealSubject(Subject):
         print("RealSubject: Handling request.")
 
 
+class ExpensiveRealSubject(RealSubject):
+    def __init__(self, setup_delay: float = 0.2) -> None:
+        sleep(setup_delay)
+
+
 class Proxy(Subject):
     def __init__(self, real_subject: RealSubject) -> None:
         self._real_subject = real_subject
@@ -29,10 +37,51 @@ class Proxy(Subject):
         print("Proxy: Logging the time of request.", end="")
 
 
+class VirtualProxy(Proxy):
+    """
+    Virtual proxy takes a factory instead of a ready subject and builds the
+    real subject on the first request, exactly once even when several
+    threads make it at the same time. `prewarm` builds it in the background.
+    """
+
+    def __init__(self, factory: Callable[[], RealSubject]) -> None:
+        self._factory = factory
+        self._subject: Optional[RealSubject] = None
+        self._lock = Lock()
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def _real_subject(self) -> RealSubject:
+        subject = self._subject
+        if subject is None:
+            with self._lock:
+                if self._subject is None:
+                    started = perf_counter()
+                    self._subject = self._factory()
+                    self.build_seconds = perf_counter() - started
+                subject = self._subject
+        return subject
+
+    @property
+    def is_built(self) -> bool:
+        return self._subject is not None
+
+    def prewarm(self) -> Thread:
+        thread = Thread(target=lambda: self._real_subject, daemon=True)
+        thread.start()
+        return thread
+
+
 def client_code(subject: Subject) -> None:
     subject.request()
 
 
+def _timed(action: Callable[[], object]) -> float:
+    started = perf_counter()
+    action()
+    return (perf_counter() - started) * 1e3
+
+
 if __name__ == "__main__":
     print("Client: Executing the client code with a real subject:")
     real_subject = RealSubject()
@@ -43,3 +92,21 @@ if __name__ == "__main__":
     print("Client: Executing the same client code with a proxy:")
     proxy = Proxy(real_subject)
     client_code(proxy)
+
+    print("\n")
+
+    print("Client: Startup and first request latency, eager vs virtual proxy:")
+    eager_startup = _timed(lambda: Proxy(ExpensiveRealSubject()))
+    virtual = VirtualProxy(ExpensiveRealSubject)
+    lazy_startup = _timed(lambda: VirtualProxy(ExpensiveRealSubject))
+    first_request = _timed(virtual.request)
+    print("")
+    prewarmed = VirtualProxy(ExpensiveRealSubject)
+    prewarmed.prewarm().join()
+    prewarmed_request = _timed(prewarmed.request)
+    print("")
+    print(f"Eager proxy startup: {eager_startup:.2f}ms, "
+          f"virtual proxy startup: {lazy_startup:.3f}ms")
+    print(f"Virtual proxy first request: {first_request:.2f}ms "
+          f"(build {virtual.build_seconds * 1e3:.2f}ms), "
+          f"after prewarm: {prewarmed_request:.3f}ms")
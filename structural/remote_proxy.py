@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import itertools
+import marshal
+import multiprocessing
+import os
+import socket
+import struct
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Any, Dict, List, Optional
+
+from structural.proxy import Subject
+
+# frame: request id, status, payload length, then a marshal encoded payload.
+# Requests carry the argument tuple, responses the result or an error text.
+_FRAME = struct.Struct("!IBI")
+_OK = 0
+_ERROR = 1
+
+
+class RemoteError(Exception):
+    """The remote subject raised while handling the request"""
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            return None
+        received += count
+    return bytes(buffer)
+
+
+def _send_frame(sock: socket.socket, lock: Lock, request_id: int, status: int, payload: Any) -> None:
+    body = marshal.dumps(payload)
+    with lock:
+        sock.sendall(_FRAME.pack(request_id, status, len(body)) + body)
+
+
+class SubjectServer:
+    """
+    Serves `subject.request(*args)` over a Unix domain socket. Requests read
+    from one connection are handled concurrently by a thread pool and the
+    responses are written back as soon as they are ready, tagged with the
+    request id, so a slow request never holds back the ones behind it.
+    """
+
+    def __init__(self, subject: Subject, path: str, workers: int = 32) -> None:
+        self._subject = subject
+        self._path = path
+        self._executor = ThreadPoolExecutor(workers)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(path)
+        self._listener.listen()
+
+    def serve_forever(self) -> None:
+        while True:
+            connection, _ = self._listener.accept()
+            Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def _serve_connection(self, connection: socket.socket) -> None:
+        write_lock = Lock()
+        with connection:
+            while True:
+                try:
+                    header = _recv_exactly(connection, _FRAME.size)
+                    if header is None:
+                        return
+                    request_id, _, length = _FRAME.unpack(header)
+                    body = _recv_exactly(connection, length)
+                except OSError:
+                    return
+                if body is None:
+                    return
+                self._executor.submit(self._handle, connection, write_lock, request_id,
+                                      marshal.loads(body))
+
+    def _handle(self, connection: socket.socket, write_lock: Lock, request_id: int, args: tuple) -> None:
+        try:
+            status, result = _OK, self._subject.request(*args)
+        except Exception as error:
+            status, result = _ERROR, f"{type(error).__name__}: {error}"
+        try:
+            try:
+                _send_frame(connection, write_lock, request_id, status, result)
+            except ValueError as error:
+                # marshal failed before anything was written, report it instead
+                _send_frame(connection, write_lock, request_id, _ERROR,
+                            f"result cannot be sent: {error}")
+        except OSError:
+            pass
+
+
+class _Connection:
+    def __init__(self, path: str) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.write_lock = Lock()
+        self.pending: Dict[int, Future] = {}
+        self.pending_lock = Lock()
+        Thread(target=self._read_responses, daemon=True).start()
+
+    def _read_responses(self) -> None:
+        while True:
+            try:
+                header = _recv_exactly(self.socket, _FRAME.size)
+                if header is None:
+                    break
+                request_id, status, length = _FRAME.unpack(header)
+                body = _recv_exactly(self.socket, length)
+            except OSError:
+                break
+            if body is None:
+                break
+            payload = marshal.loads(body)
+            with self.pending_lock:
+                future = self.pending.pop(request_id, None)
+            # a caller that timed out has already dropped its future
+            if future is not None:
+                if status == _OK:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RemoteError(payload))
+
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError("connection to the subject server was closed"))
+
+
+class RemoteProxy(Subject):
+    """
+    Remote proxy: `request(*args)` is executed by a subject in another
+    process. Calls are spread over `pool_size` connections and pipelined,
+    a caller sends its frame without waiting for earlier responses on the
+    same connection. Arguments and results must be marshal-able values.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, timeout: Optional[float] = 5.0) -> None:
+        self._connections = [_Connection(path) for _ in range(pool_size)]
+        self._timeout = timeout
+        self._ids = itertools.count(1)
+        self._next_connection = itertools.cycle(self._connections)
+
+    def request(self, *args, timeout: Optional[float] = None) -> Any:
+        request_id = next(self._ids) & 0xFFFFFFFF
+        connection = next(self._next_connection)
+        future: Future = Future()
+        with connection.pending_lock:
+            connection.pending[request_id] = future
+        try:
+            _send_frame(connection.socket, connection.write_lock, request_id, _OK, args)
+            return future.result(self._timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"remote request {request_id} timed out") from None
+        finally:
+            with connection.pending_lock:
+                connection.pending.pop(request_id, None)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            try:
+                # wakes the reader thread up before the descriptor goes away
+                connection.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.socket.close()
+
+
+class EchoSubject(Subject):
+    def __init__(self, delay: float = 0.0) -> None:
+        self._delay = delay
+
+    def request(self, payload: Any = None) -> Any:
+        if self._delay:
+            sleep(self._delay)
+        if payload == "fail":
+            raise ValueError("the subject refused the request")
+        return payload
+
+
+def _run_server(path: str, delay: float, ready) -> None:
+    server = SubjectServer(EchoSubject(delay), path)
+    ready.set()
+    server.serve_forever()
+
+
+def start_server(path: str, delay: float = 0.0, timeout: float = 10.0) -> multiprocessing.Process:
+    """Local stand-in for the remote side: a subject server in a child process"""
+    context = multiprocessing.get_context("fork")
+    # the socket file appears on bind(), connecting is possible only after listen()
+    ready = context.Event()
+    server = context.Process(target=_run_server, args=(path, delay, ready), daemon=True)
+    server.start()
+    if not ready.wait(timeout):
+        server.terminate()
+        raise RuntimeError(f"subject server did not start listening on {path} within {timeout}s")
+    return server
+
+
+def benchmark_callers(path: str, callers: int = 64, calls: int = 200) -> None:
+    for pool_size in (1, 4):
+        proxy = RemoteProxy(path, pool_size=pool_size)
+        latencies: List[List[float]] = [[] for _ in range(callers)]
+
+        def caller(index: int) -> None:
+            own = latencies[index]
+            for call in range(calls):
+                started = perf_counter()
+                proxy.request(call)
+                own.append(perf_counter() - started)
+
+        threads = [Thread(target=caller, args=(i,)) for i in range(callers)]
+        started = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started
+        proxy.close()
+
+        ordered = sorted(latency for own in latencies for latency in own)
+        print(f"Benchmark: {callers} callers over {pool_size} connection(s): "
+              f"{len(ordered) / elapsed:8,.0f} requests/s, "
+              f"p50 {ordered[len(ordered) // 2] * 1e3:6.2f}ms, "
+              f"p99 {ordered[int(len(ordered) * 0.99)] * 1e3:6.2f}ms")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "subject.sock")
+        server = start_server(path, delay=0.001)
+
+        proxy = RemoteProxy(path, pool_size=2, timeout=1.0)
+        print(f"Client: remote subject answered {proxy.request('hello')!r}")
+        try:
+            proxy.request("fail")
+        except RemoteError as error:
+            print(f"Client: remote subject failed: {error}")
+        proxy.close()
+
+        slow_path = os.path.join(directory, "slow.sock")
+        slow_server = start_server(slow_path, delay=0.5)
+        slow_proxy = RemoteProxy(slow_path, pool_size=1)
+        try:
+            slow_proxy.request("late", timeout=0.05)
+        except TimeoutError as error:
+            print(f"Client: {error}")
+        slow_proxy.close()
+        print("")
+
+        benchmark_callers(path)
+        server.terminate()
+        slow_server.terminate()